@@ -0,0 +1,94 @@
+import random
+import re
+from typing import Tuple
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.core.redis import redis_client
+
+
+class CandidatePolicy:
+    """按问题复杂度与历史一致率决定候选 SQL 数量，并持久化选优阶段的一致情况
+
+    问题按复杂度关键词命中数和长度分桶为 pattern，每个 pattern 在 Redis 中记录
+    选优样本数与候选结果完全一致的次数：简单且几乎总是一致的问题只生成 1 条，
+    复杂或经常不一致的问题生成更多
+    """
+
+    _REDIS_KEY_PREFIX = "candidate_policy"
+    _FIELD_TOTAL = "total"
+    _FIELD_AGREED = "agreed"
+
+    _COMPLEX_KEYWORDS = (
+        "同比", "环比", "占比", "比例", "比率", "排名", "排行", "top", "趋势", "累计",
+        "对比", "分别", "每个", "各个", "平均", "中位数", "去重", "没有", "未曾", "至少",
+        "超过", "按月", "按周", "按天", "分组", "留存", "转化", "窗口",
+    )
+    _CLAUSE_PATTERN = re.compile(r"[，,；;]|并且|同时|以及|然后")
+    _MAX_KEYWORD_BUCKET = 3
+    _LENGTH_BUCKETS = (20, 60)
+
+    _SIMPLE_SCORE = 0
+    _COMPLEX_SCORE = 3
+    _HIGH_AGREEMENT = 0.9
+    _LOW_AGREEMENT = 0.5
+
+    @classmethod
+    def score(cls, question: str) -> Tuple[int, str]:
+        """计算复杂度分数与 pattern 标识"""
+        text = question.lower()
+        keyword_hits = min(sum(1 for k in cls._COMPLEX_KEYWORDS if k in text), cls._MAX_KEYWORD_BUCKET)
+        length_bucket = sum(1 for bound in cls._LENGTH_BUCKETS if len(text) > bound)
+        clause_bonus = 1 if len(cls._CLAUSE_PATTERN.findall(text)) >= 2 else 0
+        return keyword_hits + length_bucket + clause_bonus, f"k{keyword_hits}:l{length_bucket}:c{clause_bonus}"
+
+    def _redis_key(self, pattern: str) -> str:
+        return f"{self._REDIS_KEY_PREFIX}:{pattern}"
+
+    async def _agreement_rate(self, pattern: str) -> float | None:
+        """返回 pattern 的历史一致率，样本不足或 Redis 不可用时返回 None"""
+        try:
+            stats = await redis_client.hgetall(self._redis_key(pattern))
+        except Exception as e:
+            logger.warning("candidate_policy.stats_load_failed", error=str(e))
+            return None
+        total = int(stats.get(self._FIELD_TOTAL, 0))
+        if total < settings.SQL_CANDIDATE_MIN_SAMPLES:
+            return None
+        return int(stats.get(self._FIELD_AGREED, 0)) / total
+
+    async def choose(self, question: str, retry_count: int) -> Tuple[int, str]:
+        """返回 (候选数量, pattern)；重试轮次说明问题并不简单，至少使用默认数量"""
+        default = settings.SQL_CANDIDATE_COUNT
+        score, pattern = self.score(question)
+        if not settings.SQL_CANDIDATE_ADAPTIVE:
+            return default, pattern
+
+        rate = await self._agreement_rate(pattern)
+        count = default
+        if score >= self._COMPLEX_SCORE or (rate is not None and rate < self._LOW_AGREEMENT):
+            count = max(default, settings.SQL_CANDIDATE_MAX_COUNT)
+        elif (
+            score <= self._SIMPLE_SCORE
+            and retry_count == 0
+            and rate is not None
+            and rate >= self._HIGH_AGREEMENT
+            and random.random() >= settings.SQL_CANDIDATE_EXPLORE_RATE
+        ):
+            count = 1
+
+        logger.info("candidate_policy.chosen", pattern=pattern, score=score, agreement_rate=rate, count=count)
+        return count, pattern
+
+    async def record(self, pattern: str, agreed: bool) -> None:
+        """记录一次多候选选优的结果是否完全一致"""
+        key = self._redis_key(pattern)
+        try:
+            await redis_client.hincrby(key, self._FIELD_TOTAL)
+            if agreed:
+                await redis_client.hincrby(key, self._FIELD_AGREED)
+        except Exception as e:
+            logger.warning("candidate_policy.stats_record_failed", error=str(e))
+
+
+candidate_policy = CandidatePolicy()
@@ -1,6 +1,7 @@
 from contextlib import asynccontextmanager
 from collections.abc import AsyncGenerator
 
+from langchain_core.messages import AIMessage
 from langmem.short_term import SummarizationNode
 from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.checkpoint.memory import MemorySaver
@@ -8,10 +9,12 @@ from langgraph.graph import StateGraph, START, END
 
 from app.agent.nodes.chart_advisor import ChartAdvisor
 from app.agent.nodes.executor import Executor
+from app.agent.nodes.finalize import Finalize
 from app.agent.nodes.follow_up import FollowUp
 from app.agent.nodes.intent_parse import IntentParse
+from app.agent.nodes.presentation_change import PresentationChange
 from app.agent.nodes.result_summarizer import ResultSummarizer
-from app.agent.nodes.schema_retriever import SchemaRetriever
+from app.agent.nodes.schema_retriever import SchemaPrefetch, SchemaRetriever
 from app.agent.nodes.sql_generator import SQLGenerator
 from app.agent.nodes.sql_judge import SQLJudge
 from app.agent.nodes.sql_selector import SQLSelector
@@ -19,9 +22,11 @@ from app.agent.nodes.sql_validator import SQLValidator
 from app.agent.states import NL2SQLState
 from app.core.config import CheckpointerType, settings
 from app.core.llm import llm
+from app.schemas.agent import ChartType
 
 SUMMARIZE = "summarize"
 SCHEMA_RETRIEVER = "schema_retriever"
+SCHEMA_PREFETCH = "schema_prefetch"
 INTENT_PARSE = "intent_parse"
 FOLLOW_UP = "follow_up"
 SQL_GENERATOR = "sql_generator"
@@ -31,15 +36,23 @@ SQL_JUDGE = "sql_judge"
 EXECUTOR = "executor"
 CHART_ADVISOR = "chart_advisor"
 RESULT_SUMMARIZER = "result_summarizer"
+FINALIZE = "finalize"
+PRESENTATION_CHANGE = "presentation_change"
 
+PRESENTATION_NODES = [CHART_ADVISOR, RESULT_SUMMARIZER]
 
-def route_after_intent_parse(state: NL2SQLState) -> str:
-    """展示变更 → CHART_ADVISOR，非查询 → END，追问 → FOLLOW_UP，查询意图 → SCHEMA_RETRIEVER"""
+
+def route_after_intent_parse(state: NL2SQLState) -> str | list[str]:
+    """展示变更 → 指定了图表类型走 PRESENTATION_CHANGE，否则图表与总结并行；
+    非查询 → END，追问 → FOLLOW_UP，查询意图 → SCHEMA_RETRIEVER
+    """
     if state.is_success is False:
         return END
     result = state.intent_parse_result
     if result.is_presentation_change:
-        return CHART_ADVISOR
+        if result.chart_preference and result.chart_preference != ChartType.NONE:
+            return PRESENTATION_CHANGE
+        return PRESENTATION_NODES
     if not result.is_query_intent:
         return END
     if result.need_follow_up:
@@ -47,6 +60,22 @@ def route_after_intent_parse(state: NL2SQLState) -> str:
     return SCHEMA_RETRIEVER
 
 
+def route_after_intent_parse_sql_only(state: NL2SQLState) -> str:
+    """SQL-only 模式没有图表节点，展示变更直接结束并沿用上一轮的 SQL 与结果"""
+    if state.is_success is False:
+        return END
+    if state.intent_parse_result.is_presentation_change:
+        return END
+    return route_after_intent_parse(state)
+
+
+def route_after_presentation_change(state: NL2SQLState) -> str | list[str]:
+    """快速路径已写入回复则结束，否则退回图表推荐与结果总结"""
+    if isinstance(state.messages[-1], AIMessage):
+        return END
+    return PRESENTATION_NODES
+
+
 def route_after_schema_retriever(state: NL2SQLState) -> str:
     if state.is_success is False:
         return END
@@ -73,6 +102,20 @@ def route_after_validate(state: NL2SQLState) -> str:
         return SQL_SELECTOR
     if state.candidate_exec_results:
         return SQL_JUDGE
+    return _route_validation_retry(state)
+
+
+def route_after_validate_fast(state: NL2SQLState) -> str:
+    """快速模式校验后路由：有合法候选直接执行，不经过选优与裁决；否则重试"""
+    if state.is_success is False:
+        return END
+    if state.validated_candidates:
+        return EXECUTOR
+    return _route_validation_retry(state)
+
+
+def _route_validation_retry(state: NL2SQLState) -> str:
+    """全部候选校验失败：语法错误 → 重新生成，EXPLAIN 错误 → 重新检索 schema"""
     if state.retry_count >= settings.AGENT_MAX_RETRIES:
         return END
     if state.syntax_result and not state.syntax_result.is_ok:
@@ -97,10 +140,18 @@ def route_after_judge(state: NL2SQLState) -> str:
     return EXECUTOR
 
 
-def route_after_executor(state: NL2SQLState) -> str:
+def route_after_executor(state: NL2SQLState) -> str | list[str]:
+    """执行成功后图表推荐与结果总结并行执行，在 FINALIZE 汇合"""
+    if state.is_success is False:
+        return END
+    return PRESENTATION_NODES
+
+
+def route_after_executor_sql_only(state: NL2SQLState) -> str:
+    """SQL-only 模式执行成功后直接组装回复消息"""
     if state.is_success is False:
         return END
-    return CHART_ADVISOR
+    return FINALIZE
 
 
 @asynccontextmanager
@@ -124,10 +175,17 @@ async def create_checkpointer() -> AsyncGenerator[BaseCheckpointSaver, None]:
     yield MemorySaver()
 
 
-def build_graph(checkpointer: BaseCheckpointSaver):
-    """构建 NL2SQL graph，checkpointer 由调用方注入"""
-    graph = StateGraph(NL2SQLState)
+def _add_common_nodes(
+    graph: StateGraph,
+    generator: SQLGenerator,
+    intent_router=route_after_intent_parse,
+) -> None:
+    """添加各 profile 共用的节点与边：摘要 → 意图解析 → 检索 → 生成 → 校验 → 执行；
+    校验之后与执行之后的路由由各 profile 自行添加
 
+    开启 SCHEMA_PREFETCH_ENABLED 时，摘要之后 schema 预取节点在后台启动检索后立即返回，与意图解析并行；
+    意图解析路由到 SCHEMA_RETRIEVER 时才等待预取结果，其余路由不受检索耗时影响
+    """
     summarization_node = SummarizationNode(
         model=llm.bind(max_tokens=settings.SUMMARIZATION_MAX_SUMMARY_TOKENS),
         max_tokens=settings.SUMMARIZATION_MAX_TOKENS,
@@ -135,28 +193,86 @@ def build_graph(checkpointer: BaseCheckpointSaver):
     )
 
     graph.add_node(SUMMARIZE, summarization_node)
-    graph.add_node(SCHEMA_RETRIEVER, SchemaRetriever())
+    retriever = SchemaRetriever()
+    graph.add_node(SCHEMA_RETRIEVER, retriever)
     graph.add_node(INTENT_PARSE, IntentParse())
     graph.add_node(FOLLOW_UP, FollowUp())
-    graph.add_node(SQL_GENERATOR, SQLGenerator())
+    graph.add_node(SQL_GENERATOR, generator)
     graph.add_node(SQL_VALIDATOR, SQLValidator())
-    graph.add_node(SQL_SELECTOR, SQLSelector())
-    graph.add_node(SQL_JUDGE, SQLJudge())
     graph.add_node(EXECUTOR, Executor())
-    graph.add_node(CHART_ADVISOR, ChartAdvisor())
-    graph.add_node(RESULT_SUMMARIZER, ResultSummarizer())
 
     graph.add_edge(START, SUMMARIZE)
     graph.add_edge(SUMMARIZE, INTENT_PARSE)
-    graph.add_conditional_edges(INTENT_PARSE, route_after_intent_parse)
+    if settings.SCHEMA_PREFETCH_ENABLED:
+        graph.add_node(SCHEMA_PREFETCH, SchemaPrefetch(retriever))
+        graph.add_edge(SUMMARIZE, SCHEMA_PREFETCH)
+        graph.add_edge(SCHEMA_PREFETCH, END)
+    graph.add_conditional_edges(INTENT_PARSE, intent_router)
     graph.add_conditional_edges(SCHEMA_RETRIEVER, route_after_schema_retriever)
     graph.add_conditional_edges(FOLLOW_UP, route_after_follow_up)
     graph.add_conditional_edges(SQL_GENERATOR, route_after_sql_generator)
+
+
+def build_graph(checkpointer: BaseCheckpointSaver):
+    """构建 NL2SQL graph，checkpointer 由调用方注入"""
+    graph = StateGraph(NL2SQLState)
+    _add_common_nodes(graph, SQLGenerator())
+
+    graph.add_node(SQL_SELECTOR, SQLSelector())
+    graph.add_node(SQL_JUDGE, SQLJudge())
+    graph.add_node(CHART_ADVISOR, ChartAdvisor())
+    graph.add_node(RESULT_SUMMARIZER, ResultSummarizer())
+    graph.add_node(FINALIZE, Finalize())
+    graph.add_node(PRESENTATION_CHANGE, PresentationChange())
+
+    graph.add_conditional_edges(SQL_VALIDATOR, route_after_validate)
+    graph.add_conditional_edges(SQL_SELECTOR, route_after_selector)
+    graph.add_conditional_edges(SQL_JUDGE, route_after_judge)
+    graph.add_conditional_edges(EXECUTOR, route_after_executor)
+    graph.add_conditional_edges(PRESENTATION_CHANGE, route_after_presentation_change)
+    graph.add_edge(PRESENTATION_NODES, FINALIZE)
+    graph.add_edge(FINALIZE, END)
+
+    return graph.compile(checkpointer=checkpointer)
+
+
+def build_sql_graph(checkpointer: BaseCheckpointSaver):
+    """构建 SQL-only profile：与 build_graph 相同的生成、选优流程，执行后由 FINALIZE 写入 SQL 与结果消息，
+    不调用图表推荐与结果总结两个 LLM 节点，供程序化调用获取 SQL 与结果
+    """
+    graph = StateGraph(NL2SQLState)
+    _add_common_nodes(graph, SQLGenerator(), intent_router=route_after_intent_parse_sql_only)
+
+    graph.add_node(SQL_SELECTOR, SQLSelector())
+    graph.add_node(SQL_JUDGE, SQLJudge())
+    graph.add_node(FINALIZE, Finalize(with_presentation=False))
+
     graph.add_conditional_edges(SQL_VALIDATOR, route_after_validate)
     graph.add_conditional_edges(SQL_SELECTOR, route_after_selector)
     graph.add_conditional_edges(SQL_JUDGE, route_after_judge)
+    graph.add_conditional_edges(EXECUTOR, route_after_executor_sql_only)
+    graph.add_edge(FINALIZE, END)
+
+    return graph.compile(checkpointer=checkpointer)
+
+
+def build_fast_graph(checkpointer: BaseCheckpointSaver):
+    """构建低延迟 profile：单候选、不经过选优与裁决、规则图表、可选模板总结
+
+    与 build_graph 共用 state schema 与 checkpointer，节点名保持一致，同一会话可在两种模式间切换
+    """
+    graph = StateGraph(NL2SQLState)
+    _add_common_nodes(graph, SQLGenerator(candidate_count=1))
+
+    graph.add_node(CHART_ADVISOR, ChartAdvisor(use_llm=False))
+    graph.add_node(RESULT_SUMMARIZER, ResultSummarizer(use_template=settings.FAST_MODE_TEMPLATE_SUMMARY))
+    graph.add_node(FINALIZE, Finalize())
+    graph.add_node(PRESENTATION_CHANGE, PresentationChange())
+
+    graph.add_conditional_edges(SQL_VALIDATOR, route_after_validate_fast)
     graph.add_conditional_edges(EXECUTOR, route_after_executor)
-    graph.add_edge(CHART_ADVISOR, RESULT_SUMMARIZER)
-    graph.add_edge(RESULT_SUMMARIZER, END)
+    graph.add_conditional_edges(PRESENTATION_CHANGE, route_after_presentation_change)
+    graph.add_edge(PRESENTATION_NODES, FINALIZE)
+    graph.add_edge(FINALIZE, END)
 
     return graph.compile(checkpointer=checkpointer)
@@ -1,7 +1,6 @@
 import json
 from typing import Any, Dict, List, Optional
 
-import sqlglot
 from sqlglot import exp
 
 from app.agent.prompts import ChatPrompt
@@ -11,7 +10,8 @@ from app.core.database import business_db
 from app.core.llm import llm
 from app.core.logger import logger
 from app.schemas.agent import ChartAdvice, ChartType
-from app.utils import chart_builder
+from app.utils import chart_builder, chart_recommender
+from app.utils.sql_parser import parse_sql
 from app.utils.timing import log_elapsed
 from app.vars.prompts import CHART_USER_PREFERENCE_SECTION, CHART_USER_WANTS_SECTION
 
@@ -21,18 +21,79 @@ _EMPTY_SAMPLE = "(empty)"
 
 _SKIP_REASON_NON_AGGREGATE = "non_aggregate_skip"
 
+_MSG_EMPTY_RESULT = "查询结果为空，无法生成图表"
+_MSG_NO_NUMERIC = "查询结果中没有数值列，无法生成图表"
+
+
+def pre_filter(
+    rows: List[Dict[str, Any]],
+    sql: str,
+    user_wants: Optional[bool],
+    dialect: str,
+) -> Optional[str]:
+    """代码前置过滤，返回 None 表示通过，否则返回跳过原因"""
+    if not rows:
+        return _MSG_EMPTY_RESULT
+
+    if not _has_numeric_column(rows[0]):
+        return _MSG_NO_NUMERIC
+
+    if not user_wants and not _has_aggregate(sql, dialect):
+        return _SKIP_REASON_NON_AGGREGATE
+
+    return None
+
+
+def skip_message(reason: str, user_wants: Optional[bool]) -> Optional[str]:
+    """前置过滤未通过时写入 chart_message 的提示，仅在用户明确要图表时给出"""
+    if reason == _SKIP_REASON_NON_AGGREGATE:
+        return None
+    return reason if user_wants else None
+
+
+def pre_filter_message(state: NL2SQLState, dialect: str) -> Optional[str]:
+    """不调用 LLM 即可确定的图表提示：前置过滤未通过时返回与 ChartAdvisor 一致的 chart_message，
+    通过时返回 None（最终是否出图由 LLM 决定）。供与 ChartAdvisor 并行执行的 ResultSummarizer 使用
+    """
+    rows = state.execute_result or []
+    sql = state.sql_result.sql if state.sql_result else ""
+    intent = state.intent_parse_result
+    user_wants = intent.wants_chart if intent else None
+    reason = pre_filter(rows, sql, user_wants, dialect)
+    return skip_message(reason, user_wants) if reason else None
+
+
+def _has_numeric_column(row: Dict[str, Any]) -> bool:
+    return any(isinstance(v, (int, float)) for v in row.values())
+
+
+def _has_aggregate(sql: str, dialect: str) -> bool:
+    if not sql:
+        return False
+    try:
+        ast = parse_sql(sql, dialect, copy=False)
+    except Exception:
+        return False
+
+    for node in ast.walk():
+        if isinstance(node, (exp.AggFunc, exp.Group)):
+            return True
+    return False
+
 
 class ChartAdvisor:
-    """根据查询结果推荐图表类型并生成 ECharts option"""
+    """根据查询结果推荐图表类型并生成 ECharts option；use_llm=False 时按列类型规则推荐，不调用 LLM
+
+    use_llm=True 时先尝试高置信度规则推荐，结果形态模糊时才调用 LLM
+    """
 
-    _MSG_EMPTY_RESULT = "查询结果为空，无法生成图表"
-    _MSG_NO_NUMERIC = "查询结果中没有数值列，无法生成图表"
     _MSG_LLM_UNAVAILABLE = "图表推荐服务暂时不可用"
     _MSG_NOT_SUITABLE = "当前数据不适合图表展示"
     _MSG_BUILD_FAILED = "图表生成失败"
     _MSG_FIELD_NOT_FOUND = "推荐的{}字段 '{}' 不存在于查询结果中"
 
-    def __init__(self):
+    def __init__(self, use_llm: bool = True):
+        self.use_llm = use_llm
         self.structured_llm = llm.with_structured_output(ChartAdvice).with_retry(
             stop_after_attempt=settings.LLM_RETRY_ATTEMPTS,
             wait_exponential_jitter=True,
@@ -45,11 +106,23 @@ class ChartAdvisor:
         intent = state.intent_parse_result
         user_wants = intent.wants_chart if intent else None
 
-        skip_reason = self._pre_filter(rows, sql, user_wants)
+        skip_reason = pre_filter(rows, sql, user_wants, self.dialect.sqlglot_dialect)
         if skip_reason:
             return self._skip_result(skip_reason, user_wants)
 
         question = self._extract_question(state)
+        if not self.use_llm:
+            return self._rule_based_result(rows, question, intent, user_wants)
+
+        if settings.CHART_RULE_FAST_PATH_ENABLED:
+            preference = intent.chart_preference if intent and intent.wants_chart else None
+            advice = chart_recommender.recommend_confident(
+                rows, title=question, preference=preference,
+                max_categories=settings.CHART_RULE_MAX_CATEGORIES,
+            )
+            if advice is not None:
+                return self._build_result(advice, rows, user_wants, "chart_advisor.rule_fast_path_completed")
+
         columns_info = self._build_columns_info(rows)
         sample = self._build_sample(rows)
         preference_section = self._build_preference_section(intent)
@@ -78,66 +151,49 @@ class ChartAdvisor:
             logger.warning("chart_advisor.field_validation_failed", error=validation_error)
             return self._none_result(validation_error if user_wants else None)
 
-        try:
-            option = chart_builder.build(advice, rows)
-        except Exception as e:
-            logger.warning("chart_advisor.build_failed", error=str(e))
-            return self._none_result(self._MSG_BUILD_FAILED if user_wants else None)
-
-        logger.info("chart_advisor.completed", chart_type=advice.chart_type.value)
-        return {"chart_option": option, "chart_message": None}
+        return self._build_result(advice, rows, user_wants, "chart_advisor.completed")
 
-    def _pre_filter(
+    def _rule_based_result(
         self,
         rows: List[Dict[str, Any]],
-        sql: str,
+        question: str,
+        intent,
         user_wants: Optional[bool],
-    ) -> Optional[str]:
-        """代码前置过滤，返回 None 表示通过，否则返回跳过原因"""
-        if not rows:
-            return self._MSG_EMPTY_RESULT
-
-        if not self._has_numeric_column(rows[0]):
-            return self._MSG_NO_NUMERIC
-
-        if not user_wants and not self._has_aggregate(sql):
-            return _SKIP_REASON_NON_AGGREGATE
-
-        return None
+    ) -> Dict[str, Any]:
+        """按列类型规则推荐并构建图表"""
+        preference = intent.chart_preference if intent and intent.wants_chart else None
+        advice = chart_recommender.recommend(rows, title=question, preference=preference)
+        if advice is None:
+            return self._none_result(self._MSG_NOT_SUITABLE if user_wants else None)
+        return self._build_result(advice, rows, user_wants, "chart_advisor.rule_based_completed")
 
-    def _skip_result(
+    def _build_result(
         self,
-        reason: str,
+        advice: ChartAdvice,
+        rows: List[Dict[str, Any]],
         user_wants: Optional[bool],
+        event: str,
     ) -> Dict[str, Any]:
-        if reason == _SKIP_REASON_NON_AGGREGATE:
-            return self._none_result(None)
-        msg = reason if user_wants else None
+        """由图表建议构建 ECharts option，构建失败时按用户意图给出提示"""
+        try:
+            option = chart_builder.build(advice, rows)
+        except Exception as e:
+            logger.warning("chart_advisor.build_failed", error=str(e))
+            return self._none_result(self._MSG_BUILD_FAILED if user_wants else None)
+        logger.info(event, chart_type=advice.chart_type.value)
+        return {"chart_option": option, "chart_message": None}
+
+    @classmethod
+    def _skip_result(cls, reason: str, user_wants: Optional[bool]) -> Dict[str, Any]:
+        msg = skip_message(reason, user_wants)
         if msg:
             logger.info("chart_advisor.skipped", reason=reason)
-        return self._none_result(msg)
+        return cls._none_result(msg)
 
     @staticmethod
     def _none_result(message: Optional[str]) -> Dict[str, Any]:
         return {"chart_option": None, "chart_message": message}
 
-    @staticmethod
-    def _has_numeric_column(row: Dict[str, Any]) -> bool:
-        return any(isinstance(v, (int, float)) for v in row.values())
-
-    def _has_aggregate(self, sql: str) -> bool:
-        if not sql:
-            return False
-        try:
-            ast = sqlglot.parse_one(sql, dialect=self.dialect.sqlglot_dialect)
-        except Exception:
-            return False
-
-        for node in ast.walk():
-            if isinstance(node, (exp.AggFunc, exp.Group)):
-                return True
-        return False
-
     @staticmethod
     def _extract_question(state: NL2SQLState) -> str:
         for msg in reversed(state.summarized_messages or state.messages):
@@ -1,10 +1,12 @@
-from typing import Any, Dict, List
+from contextlib import aclosing
+from typing import Any, Dict, List, Optional, Tuple
 
 from app.agent.states import NL2SQLState
+from app.core.cache import candidate_result_cache
 from app.core.config import settings
 from app.core.database import business_db
 from app.core.logger import logger
-from app.schemas.agent import AgentErrorCode
+from app.schemas.agent import AgentErrorCode, SQLResult
 from app.utils.timing import log_elapsed
 
 
@@ -13,37 +15,104 @@ class Executor:
 
     def __init__(self):
         self.db = business_db
+        self.dialect = business_db.dialect
 
-    async def _execute_sql(self, sql: str) -> List[Dict[str, Any]]:
-        return await self.db.execute_query(sql)
+    def _limit_sql(self, sql: str, limit: int) -> str:
+        """将行数上限下推到 SQL，改写失败时返回原 SQL 并在内存中截断"""
+        try:
+            return self.dialect.apply_row_limit(sql, limit)
+        except Exception as e:
+            logger.warning("executor.row_limit_rewrite_failed", error=str(e))
+            return sql
+
+    async def _execute_sql(self, sql: str) -> Tuple[List[Dict[str, Any]], List[str], bool]:
+        """多取一行流式读取以判断是否超出上限，读满即关闭游标，返回截断后的结果、列名与截断标记"""
+        max_rows = settings.EXECUTOR_MAX_ROWS
+        limited_sql = self._limit_sql(sql, max_rows + 1)
+        rows: List[Dict[str, Any]] = []
+        columns: List[str] = []
+        async with aclosing(
+            self.db.stream_query(
+                limited_sql,
+                batch_size=settings.EXECUTOR_FETCH_BATCH_SIZE,
+                timeout=settings.EXECUTOR_TIMEOUT,
+                columns=columns,
+            )
+        ) as batches:
+            async for batch in batches:
+                rows.extend(batch)
+                if len(rows) > max_rows:
+                    break
+        truncated = len(rows) > max_rows
+        return rows[:max_rows], columns, truncated
+
+    @staticmethod
+    async def _take_reusable_result(
+        state: NL2SQLState, sql: str,
+    ) -> Optional[Tuple[List[str], List[Dict[str, Any]]]]:
+        """取出 sql_selector 已完整执行过的同一条 SQL 的 (列名, 结果)，并清除本轮所有候选的缓存结果；
+        缓存已过期或不在本进程时返回 None，重新执行
+        """
+        reusable = None
+        for entry in state.candidate_exec_results:
+            if entry.result_key is None:
+                continue
+            if reusable is None and entry.sql == sql:
+                reusable = await candidate_result_cache.get(entry.result_key)
+            await candidate_result_cache.delete(entry.result_key)
+        return reusable
+
+    @staticmethod
+    def _resolve_sql(state: NL2SQLState) -> Optional[str]:
+        """取选优后的 SQL；未经过选优（快速模式）时取开销最低的合法候选"""
+        if state.sql_result and state.sql_result.sql:
+            return state.sql_result.sql
+        if state.validated_candidates:
+            return min(state.validated_candidates, key=lambda c: c.explain.cost).sql
+        return None
 
     async def __call__(self, state: NL2SQLState) -> Dict[str, Any]:
-        if not state.sql_result or not state.sql_result.sql:
+        sql = self._resolve_sql(state)
+        if not sql:
             logger.warning("executor.no_sql")
             return {
                 "is_success": False,
                 "error_code": AgentErrorCode.NO_SQL,
                 "error_message": AgentErrorCode.NO_SQL.message,
             }
+        # 快速模式下 SQL 取自候选，回写 sql_result 供图表与总结节点使用
+        selected: Dict[str, Any] = {}
+        if not state.sql_result or state.sql_result.sql != sql:
+            selected["sql_result"] = SQLResult(sql=sql)
+
+        reusable = await self._take_reusable_result(state, sql)
+        if reusable is not None:
+            columns, rows = reusable
+            logger.info("executor.reused_selector_result", row_count=len(rows))
+            return {
+                **selected,
+                "execute_result": rows,
+                "execute_columns": columns,
+                "execute_truncated": False,
+                "is_success": True,
+            }
 
-        sql = state.sql_result.sql
         logger.info("executor.start")
 
         try:
             async with log_elapsed(logger, "executor.query_completed") as ctx:
-                result = await self._execute_sql(sql)
+                result, columns, truncated = await self._execute_sql(sql)
                 ctx["row_count"] = len(result)
         except Exception as e:
             logger.error("executor.query_failed", error=str(e))
             return {
+                **selected,
                 "is_success": False,
                 "error_code": AgentErrorCode.EXECUTION_ERROR,
                 "error_message": str(e),
             }
 
-        truncated = len(result) > settings.EXECUTOR_MAX_ROWS
         if truncated:
-            result = result[:settings.EXECUTOR_MAX_ROWS]
             logger.info(
                 "executor.result_truncated",
                 max_rows=settings.EXECUTOR_MAX_ROWS,
@@ -51,6 +120,9 @@ class Executor:
 
         logger.info("executor.completed")
         return {
+            **selected,
             "execute_result": result,
+            "execute_columns": columns,
+            "execute_truncated": truncated,
             "is_success": True,
         }
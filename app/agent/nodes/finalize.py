@@ -0,0 +1,30 @@
+from typing import Any, Dict
+
+from langchain_core.messages import AIMessage
+
+from app.agent.states import NL2SQLState
+
+
+class Finalize:
+    """汇合图表与总结两路结果，组装最终回复消息"""
+
+    _FALLBACK_SUMMARY = "查询完成。"
+
+    def __init__(self, with_presentation: bool = True):
+        # SQL-only profile 没有图表与总结节点，不读取状态中上一轮残留的图表与总结
+        self.with_presentation = with_presentation
+
+    async def __call__(self, state: NL2SQLState) -> Dict[str, Any]:
+        sql = state.sql_result.sql if state.sql_result else ""
+        summary = (self.with_presentation and state.summary) or self._FALLBACK_SUMMARY
+        content = f"```sql\n{sql}\n```\n\n{summary}" if sql else summary
+
+        additional_kwargs: dict = {}
+        if self.with_presentation and state.chart_option:
+            additional_kwargs["chart_option"] = state.chart_option
+        if state.execute_result:
+            additional_kwargs["execute_result"] = state.execute_result
+        if state.execute_truncated:
+            additional_kwargs["truncated"] = True
+
+        return {"messages": [AIMessage(content=content, additional_kwargs=additional_kwargs)]}
@@ -0,0 +1,61 @@
+from typing import Any, Dict, Optional
+
+from langchain_core.messages import AIMessage
+
+from app.agent.states import NL2SQLState
+from app.core.logger import logger
+from app.schemas.agent import ChartType
+from app.utils import chart_builder, chart_recommender
+
+
+class PresentationChange:
+    """展示变更快速路径：按用户指定的图表类型和上一轮结果确定性地重建图表，复用上一轮总结，不调用 LLM
+
+    无法确定字段映射或构建失败时不写入消息，由路由退回 ChartAdvisor / ResultSummarizer
+    """
+
+    async def __call__(self, state: NL2SQLState) -> Dict[str, Any]:
+        intent = state.intent_parse_result
+        preference = intent.chart_preference if intent else None
+        rows = state.execute_result or []
+        previous = self._previous_reply(state)
+        if not rows or not preference or preference == ChartType.NONE or previous is None:
+            logger.info("presentation_change.fallback", reason="insufficient_context")
+            return {}
+
+        if not chart_recommender.fits_preference(rows, preference):
+            logger.info("presentation_change.fallback", reason="preference_mismatch", preference=preference.value)
+            return {}
+
+        advice = chart_recommender.recommend(rows, title=self._previous_title(state), preference=preference)
+        if advice is None:
+            logger.info("presentation_change.fallback", reason="no_field_mapping", preference=preference.value)
+            return {}
+
+        try:
+            option = chart_builder.build(advice, rows)
+        except Exception as e:
+            logger.warning("presentation_change.build_failed", error=str(e))
+            return {}
+
+        additional_kwargs = {**previous.additional_kwargs, "chart_option": option}
+        logger.info("presentation_change.completed", chart_type=advice.chart_type.value)
+        return {
+            "chart_option": option,
+            "chart_message": None,
+            "messages": [AIMessage(content=previous.content, additional_kwargs=additional_kwargs)],
+        }
+
+    @staticmethod
+    def _previous_reply(state: NL2SQLState) -> Optional[AIMessage]:
+        """上一轮带查询结果的回复，其正文（SQL 与总结）直接复用"""
+        for msg in reversed(state.messages):
+            if isinstance(msg, AIMessage) and msg.additional_kwargs.get("execute_result"):
+                return msg
+        return None
+
+    @staticmethod
+    def _previous_title(state: NL2SQLState) -> str:
+        if not state.chart_option:
+            return ""
+        return (state.chart_option.get("title") or {}).get("text", "")
@@ -1,11 +1,11 @@
 import json
-from typing import Any, Dict, List
-
-from langchain_core.messages import AIMessage
+from typing import Any, Dict, List, Optional
 
+from app.agent.nodes.chart_advisor import pre_filter_message
 from app.agent.prompts import ChatPrompt
 from app.agent.states import NL2SQLState
 from app.core.config import settings
+from app.core.database import business_db
 from app.core.llm import llm
 from app.core.logger import logger
 from app.utils.timing import log_elapsed
@@ -13,14 +13,19 @@ from app.vars.prompts import CHART_FEEDBACK_SECTION
 
 
 class ResultSummarizer:
-    """调用 LLM 对查询结果进行自然语言总结"""
+    """调用 LLM 对查询结果进行自然语言总结；use_template=True 时直接使用模板文案
+
+    与 ChartAdvisor 并行执行，图表提示取自可确定的前置过滤结果，总结写入 summary，由 finalize 节点组装消息
+    """
 
     _SAMPLE_MAX_ROWS = 20
     _EMPTY_RESULT_TEXT = "(无数据)"
     _FALLBACK_NO_DATA = "查询完成，未找到匹配的数据。"
     _FALLBACK_WITH_DATA = "查询完成，共返回 {} 行数据。"
 
-    def __init__(self):
+    def __init__(self, use_template: bool = False):
+        self.use_template = use_template
+        self.dialect = business_db.dialect
         self.llm = llm.with_retry(
             stop_after_attempt=settings.LLM_RETRY_ATTEMPTS,
             wait_exponential_jitter=True,
@@ -34,13 +39,28 @@ class ResultSummarizer:
         return json.dumps(sample, ensure_ascii=False, default=str)
 
     async def __call__(self, state: NL2SQLState) -> Dict[str, Any]:
-        """根据用户问题、SQL 和执行结果生成自然语言总结，写入 messages"""
+        """根据用户问题、SQL 和执行结果生成自然语言总结，写入 summary"""
         sql = state.sql_result.sql if state.sql_result else ""
         rows = state.execute_result or []
+        chart_message = pre_filter_message(state, self.dialect.sqlglot_dialect)
+
+        if self.use_template:
+            summary = self._template_summary(chart_message, len(rows))
+        else:
+            summary = await self._llm_summary(state, sql, rows, chart_message)
+        return {"summary": summary}
 
+    async def _llm_summary(
+        self,
+        state: NL2SQLState,
+        sql: str,
+        rows: List[Dict[str, Any]],
+        chart_message: Optional[str],
+    ) -> str:
+        """调用 LLM 生成总结，失败时退化为兜底文案"""
         chart_feedback = ""
-        if state.chart_message:
-            chart_feedback = CHART_FEEDBACK_SECTION.format(chart_message=state.chart_message)
+        if chart_message:
+            chart_feedback = CHART_FEEDBACK_SECTION.format(chart_message=chart_message)
 
         prompt_messages = ChatPrompt.result_summary_prompt(
             messages=state.summarized_messages,
@@ -53,20 +73,18 @@ class ResultSummarizer:
         try:
             async with log_elapsed(logger, "result_summarizer.completed"):
                 response = await self.llm.ainvoke(prompt_messages)
-            summary = response.content.strip()
+            return response.content.strip()
         except Exception as e:
             logger.warning("result_summarizer.failed", error=str(e))
-            summary = self._fallback_summary(len(rows))
+            return self._fallback_summary(len(rows))
 
-        content = f"```sql\n{sql}\n```\n\n{summary}" if sql else summary
-
-        additional_kwargs: dict = {}
-        if state.chart_option:
-            additional_kwargs["chart_option"] = state.chart_option
-        if state.execute_result:
-            additional_kwargs["execute_result"] = state.execute_result
-
-        return {"messages": [AIMessage(content=content, additional_kwargs=additional_kwargs)]}
+    @classmethod
+    def _template_summary(cls, chart_message: Optional[str], row_count: int) -> str:
+        """不调用 LLM 的模板总结，附带图表无法生成的原因"""
+        summary = cls._fallback_summary(row_count)
+        if chart_message:
+            summary = f"{summary}{chart_message}"
+        return summary
 
     @classmethod
     def _fallback_summary(cls, row_count: int) -> str:
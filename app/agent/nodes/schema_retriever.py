@@ -1,38 +1,194 @@
 import asyncio
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import xxhash
+from langchain_core.runnables import RunnableConfig
+from sqlglot import exp
 
 from app.agent.states import NL2SQLState
+from app.core.cache import ann_cache, retrieval_cache, schema_fingerprint
+from app.core.catalog import schema_catalog
 from app.core.config import settings
+from app.core.database import business_db
 from app.core.logger import logger
 from app.core.vector_store import vector_store_manager
 from app.schemas.agent import AgentErrorCode
+from app.utils.bm25 import reciprocal_rank_fusion
+from app.utils.sql_parser import parse_sql
 from app.utils.timing import log_elapsed
 from app.vars.vars import HUMAN_TYPE
 
 
 class SchemaRetriever:
+    _RUNNING_SUMMARY_KEY = "running_summary"
+    # 预取完成后等待 schema_retriever 取用的时间，非查询路由不会取用，到期丢弃
+    _PREFETCH_KEEP_SECONDS = 60
+
     def __init__(self):
         self._vs_manager = vector_store_manager
+        self._prefetch_tasks: Dict[str, asyncio.Task] = {}
 
-    @staticmethod
-    def _build_retrieval_query(state: NL2SQLState) -> str:
-        """从对话历史中提取用户消息构建检索查询"""
+    @classmethod
+    def build_retrieval_query(cls, state: NL2SQLState) -> str:
+        """用最近 SCHEMA_RETRIEVAL_WINDOW 条用户消息加上对话摘要构建检索查询，长度不随对话轮数增长"""
         if not state.messages:
             return ""
 
         user_messages = [
             msg.content for msg in state.messages
             if msg.type == HUMAN_TYPE
-        ]
+        ][-settings.SCHEMA_RETRIEVAL_WINDOW:]
+        running_summary = state.context.get(cls._RUNNING_SUMMARY_KEY)
+        summary = getattr(running_summary, "summary", None)
+        if summary:
+            user_messages.insert(0, summary)
         return "\n".join(user_messages)
 
-    def _search(self, query: str) -> list[str]:
-        results = self._vs_manager.vector_store.similarity_search(
-            query, k=settings.MILVUS_SEARCH_LIMIT
-        )
+    @staticmethod
+    def latest_question(state: NL2SQLState) -> str:
+        for msg in reversed(state.messages):
+            if msg.type == HUMAN_TYPE:
+                return msg.content
+        return ""
+
+    @staticmethod
+    def _query_tables(state: NL2SQLState) -> set[str]:
+        """上一轮候选 SQL 引用的表名，无法解析的候选跳过"""
+        dialect = business_db.dialect.sqlglot_dialect
+        tables: set[str] = set()
+        for candidate in state.sql_candidates:
+            try:
+                tree = parse_sql(candidate.sql, dialect, copy=False)
+            except Exception:
+                continue
+            tables.update(table.name for table in tree.find_all(exp.Table))
+        return tables
+
+    @classmethod
+    def _lookup_missing(cls, state: NL2SQLState) -> list[str]:
+        """按校验错误中不存在的标识符在本地目录中定向查找，只返回尚未检索到的表结构；
+        列名命中多张表时优先候选 SQL 已引用的表
+        """
+        if not schema_catalog.is_loaded:
+            return []
+        existing = set(state.schemas)
+        query_tables = cls._query_tables(state)
+        schemas: list[str] = []
+        for identifier in state.missing_identifiers:
+            for meta in schema_catalog.lookup(identifier, query_tables):
+                ddl = meta.ddl.strip()
+                if ddl and ddl not in existing and ddl not in schemas:
+                    schemas.append(ddl)
+        return schemas
+
+    def _search_by_vector(self, embedding: List[float], k: int) -> list[str]:
+        results = self._vs_manager.vector_store.similarity_search_by_vector(embedding, k=k)
         return [doc.page_content for doc in results]
 
-    async def __call__(self, state: NL2SQLState) -> Dict[str, Any]:
+    async def _cached_search_by_vector(self, embedding: List[float], fingerprint: str) -> list[str]:
+        """按 (schema 指纹, k, 向量摘要) 缓存向量检索结果，空结果不缓存"""
+        k = settings.MILVUS_SEARCH_LIMIT
+        if not settings.EMBEDDING_CACHE_ENABLED:
+            return await asyncio.to_thread(self._search_by_vector, embedding, k)
+
+        digest = xxhash.xxh3_128_hexdigest(np.asarray(embedding, dtype=np.float32).tobytes())
+        key = f"{fingerprint}:{k}:{digest}"
+
+        async def compute() -> Optional[list[str]]:
+            return await asyncio.to_thread(self._search_by_vector, embedding, k) or None
+
+        return await ann_cache.get_or_compute(key, compute, cache_none=False) or []
+
+    async def search(self, query: str, thread_id: Optional[str] = None, question: Optional[str] = None) -> list[str]:
+        """检索表结构：查询向量与检索结果分别缓存；开启会话缓存时，
+        本轮用户问题与本会话上次检索时的问题向量足够相似则直接复用上次结果
+
+        复用判断只比较最新一条用户问题（未提供时退化为整个查询），检索查询里的摘要和历史消息在换话题后
+        仍占多数，会让整体相似度偏高
+        """
+        fingerprint = await schema_fingerprint.get()
+        use_thread_cache = settings.SCHEMA_RETRIEVAL_CACHE_ENABLED and thread_id
+        if not use_thread_cache:
+            return await self._search(query, await self._vs_manager.aembed_query(query), fingerprint)
+
+        question = question or query
+        question_embedding = await self._vs_manager.aembed_query(question)
+        cached = await retrieval_cache.get(thread_id)
+        if cached is not None:
+            cached_fingerprint, cached_embedding, cached_hits = cached
+            similarity = self._cosine_similarity(question_embedding, cached_embedding)
+            if cached_fingerprint == fingerprint and similarity >= settings.SCHEMA_RETRIEVAL_REUSE_THRESHOLD:
+                logger.info("schema_retriever.cache_hit", similarity=round(similarity, 4))
+                return cached_hits
+
+        embedding = question_embedding if question == query else await self._vs_manager.aembed_query(query)
+        hits = await self._search(query, embedding, fingerprint)
+        if hits:
+            await retrieval_cache.set(thread_id, (fingerprint, question_embedding, hits))
+        return hits
+
+    async def _search(self, query: str, embedding: List[float], fingerprint: str) -> list[str]:
+        return self._fuse_lexical(query, await self._cached_search_by_vector(embedding, fingerprint))
+
+    @staticmethod
+    def _fuse_lexical(query: str, vector_hits: list[str]) -> list[str]:
+        """向量命中与 BM25 词法命中按 RRF 融合，截取 MILVUS_SEARCH_LIMIT 条；目录未加载时仅用向量结果"""
+        if not settings.SCHEMA_HYBRID_ENABLED or not schema_catalog.is_loaded:
+            return vector_hits
+        lexical_hits = [
+            meta.ddl.strip()
+            for meta in schema_catalog.lexical_search(query, settings.SCHEMA_LEXICAL_LIMIT)
+        ]
+        if not lexical_hits:
+            return vector_hits
+        fused = reciprocal_rank_fusion([vector_hits, lexical_hits], k=settings.SCHEMA_RRF_K)
+        logger.debug("schema_retriever.hybrid_fused", vector=len(vector_hits), lexical=len(lexical_hits))
+        return fused[:settings.MILVUS_SEARCH_LIMIT]
+
+    @staticmethod
+    def _cosine_similarity(a: List[float], b: List[float]) -> float:
+        va, vb = np.asarray(a, dtype=np.float32), np.asarray(b, dtype=np.float32)
+        norm = float(np.linalg.norm(va) * np.linalg.norm(vb))
+        return float(va @ vb) / norm if norm else 0.0
+
+    @staticmethod
+    def thread_id(config: Optional[RunnableConfig]) -> Optional[str]:
+        return ((config or {}).get("configurable") or {}).get("thread_id")
+
+    def start_prefetch(self, query: str, thread_id: str, question: str) -> None:
+        """在后台启动本轮检索，替换该会话尚未取用的上一次预取"""
+        previous = self._prefetch_tasks.pop(thread_id, None)
+        if previous is not None:
+            previous.cancel()
+        task = asyncio.create_task(self._prefetch(query, thread_id, question))
+        self._prefetch_tasks[thread_id] = task
+        task.add_done_callback(lambda t: self._expire_prefetch(thread_id, t))
+
+    async def _prefetch(self, query: str, thread_id: str, question: str) -> Optional[list[str]]:
+        try:
+            async with log_elapsed(logger, "schema_prefetch.completed"):
+                return await self.search(query, thread_id, question)
+        except Exception as e:
+            logger.warning("schema_prefetch.failed", error=str(e))
+            return None
+
+    def _expire_prefetch(self, thread_id: str, task: asyncio.Task) -> None:
+        """预取结束后保留 _PREFETCH_KEEP_SECONDS 供 schema_retriever 取用，之后丢弃"""
+        def drop() -> None:
+            if self._prefetch_tasks.get(thread_id) is task:
+                del self._prefetch_tasks[thread_id]
+
+        asyncio.get_running_loop().call_later(self._PREFETCH_KEEP_SECONDS, drop)
+
+    async def _take_prefetched(self, thread_id: Optional[str]) -> Optional[list[str]]:
+        """取出并等待本会话的预取结果；没有预取或预取失败返回 None"""
+        task = self._prefetch_tasks.pop(thread_id, None) if thread_id else None
+        if task is None:
+            return None
+        return await task
+
+    async def __call__(self, state: NL2SQLState, config: RunnableConfig) -> Dict[str, Any]:
         logger.info(
             "schema_retriever.start",
             schema_retry_count=state.schema_retry_count,
@@ -46,7 +202,32 @@ class SchemaRetriever:
                 "error_message": AgentErrorCode.SCHEMA_RETRY_LIMIT.message,
             }
 
-        query = self._build_retrieval_query(state)
+        if state.missing_identifiers:
+            schemas = self._lookup_missing(state)
+            if schemas:
+                logger.info(
+                    "schema_retriever.targeted_completed",
+                    identifiers=state.missing_identifiers,
+                    schema_count=len(schemas),
+                )
+                return {
+                    "schemas": schemas,
+                    "missing_identifiers": [],
+                    "schema_retry_count": state.schema_retry_count + 1,
+                }
+            logger.info("schema_retriever.targeted_no_new_schema", identifiers=state.missing_identifiers)
+
+        if not state.missing_identifiers:
+            prefetched = await self._take_prefetched(self.thread_id(config))
+            if prefetched:
+                logger.info("schema_retriever.prefetch_hit", schema_count=len(prefetched))
+                return {
+                    "schemas": prefetched,
+                    "missing_identifiers": [],
+                    "schema_retry_count": state.schema_retry_count + 1,
+                }
+
+        query = self.build_retrieval_query(state)
         if not query:
             logger.warning("schema_retriever.empty_query")
             return {
@@ -57,7 +238,7 @@ class SchemaRetriever:
 
         try:
             async with log_elapsed(logger, "schema_retriever.search_completed"):
-                schemas = await asyncio.to_thread(self._search, query)
+                schemas = await self.search(query, self.thread_id(config), self.latest_question(state))
         except Exception as e:
             logger.error("schema_retriever.search_failed", error=str(e))
             return {
@@ -77,5 +258,29 @@ class SchemaRetriever:
         logger.info("schema_retriever.completed", schema_count=len(schemas))
         return {
             "schemas": schemas,
+            "missing_identifiers": [],
             "schema_retry_count": state.schema_retry_count + 1,
         }
+
+
+class SchemaPrefetch:
+    """摘要完成后在后台启动向量检索，节点本身立即返回，不拖慢与之并行的意图解析所在的 superstep
+
+    意图解析路由到 schema_retriever 时由其等待并取用结果；其余路由（闲聊、展示变更等）不等待，
+    结果留在检索缓存中，未取用的任务到期丢弃。预取失败时 schema_retriever 按原流程重新检索
+    """
+
+    def __init__(self, retriever: SchemaRetriever):
+        self._retriever = retriever
+
+    async def __call__(self, state: NL2SQLState, config: RunnableConfig) -> Dict[str, Any]:
+        if state.schema_retry_count >= settings.AGENT_MAX_SCHEMA_RETRIES:
+            return {}
+
+        thread_id = self._retriever.thread_id(config)
+        query = self._retriever.build_retrieval_query(state)
+        if not thread_id or not query:
+            return {}
+
+        self._retriever.start_prefetch(query, thread_id, self._retriever.latest_question(state))
+        return {}
@@ -1,8 +1,12 @@
 import asyncio
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
 from langchain_core.messages import BaseMessage
+from langchain_core.output_parsers.openai_tools import PydanticToolsParser
+from langchain_core.runnables.config import ensure_config
+from langchain_core.utils.function_calling import convert_to_openai_tool
 
+from app.agent.candidate_policy import candidate_policy
 from app.agent.prompts import ChatPrompt
 from app.agent.states import NL2SQLState
 from app.core.config import settings
@@ -10,15 +14,23 @@ from app.core.database import business_db
 from app.core.llm import llm
 from app.core.logger import logger
 from app.schemas.agent import AgentErrorCode, SQLResult
+from app.utils.sql_canonical import canonical_hash
 from app.utils.timing import log_elapsed
 from app.vars.prompts import VALIDATION_FEEDBACK_SECTION
+from app.vars.vars import HUMAN_TYPE
 
 
 class SQLGenerator:
     """基于对话历史和 schema 并发生成多条候选 SQL"""
 
-    def __init__(self):
+    _SQL_TOOL = convert_to_openai_tool(SQLResult)
+    _SQL_TOOL_CHOICE = {"type": "function", "function": {"name": _SQL_TOOL["function"]["name"]}}
+
+    def __init__(self, candidate_count: Optional[int] = None):
+        """candidate_count 指定时固定生成该数量的候选，不经过自适应策略"""
         self.dialect = business_db.dialect
+        self.candidate_count = candidate_count
+        self._tool_parser = PydanticToolsParser(tools=[SQLResult], first_tool_only=True)
 
     @staticmethod
     def _build_validation_feedback(state: NL2SQLState) -> str:
@@ -72,17 +84,93 @@ class SQLGenerator:
             logger.warning("sql_generator.candidate_failed", error=str(e))
             return None
 
-    async def _generate_candidates(
+    async def _generate_choices(
         self, prompt_messages: List[BaseMessage], count: int, temperature: float,
     ) -> List[SQLResult]:
-        """并发生成指定数量的候选 SQL，过滤空结果"""
+        """单次请求通过 n 参数返回多个 choice 并逐个解析，prompt 只发送一次；
+        请求失败返回空列表，由调用方退化为并发生成
+
+        沿用当前节点的 callbacks 以便追踪；强制非流式调用，否则 SSE 的 messages 流模式会让请求走流式接口，
+        流式响应只读取 choices[0]，n 个 tool call 会被合并成一个
+        """
+        model = llm.model_copy(update={"n": count, "temperature": temperature, "disable_streaming": True})
+        try:
+            async with log_elapsed(logger, "sql_generator.choices_completed") as ctx:
+                result = await model.agenerate(
+                    [prompt_messages],
+                    tools=[self._SQL_TOOL],
+                    tool_choice=self._SQL_TOOL_CHOICE,
+                    callbacks=ensure_config().get("callbacks"),
+                )
+                generations = result.generations[0]
+                ctx["requested"] = count
+                ctx["returned"] = len(generations)
+        except Exception as e:
+            logger.warning("sql_generator.choices_failed", error=str(e))
+            return []
+
+        candidates: List[SQLResult] = []
+        for generation in generations:
+            try:
+                parsed = self._tool_parser.parse_result([generation])
+            except Exception as e:
+                logger.warning("sql_generator.choice_parse_failed", error=str(e))
+                continue
+            if parsed is not None and parsed.sql:
+                candidates.append(parsed)
+        return candidates
+
+    def _reached_quorum(self, candidates: List[SQLResult]) -> bool:
+        """规范化后相同的候选是否已达到 SQL_CANDIDATE_QUORUM"""
+        quorum = settings.SQL_CANDIDATE_QUORUM
+        if quorum <= 0 or not candidates:
+            return False
+        votes: Dict[str, int] = {}
+        for candidate in candidates:
+            key = canonical_hash(candidate.sql, self.dialect.sqlglot_dialect)
+            votes[key] = votes.get(key, 0) + 1
+        return max(votes.values()) >= quorum
+
+    async def _generate_candidates(
+        self, prompt_messages: List[BaseMessage], count: int, temperature: float,
+    ) -> Tuple[List[SQLResult], bool]:
+        """并发生成指定数量的候选 SQL，按完成顺序收集并过滤空结果，返回 (候选, 是否因达到法定票数提前结束)；
+        规范化后相同的候选达到 SQL_CANDIDATE_QUORUM 条时取消其余请求，避免最慢的一次调用拖累整体耗时
+        """
+        quorum = settings.SQL_CANDIDATE_QUORUM
         async with log_elapsed(logger, "sql_generator.candidates_completed") as ctx:
-            tasks = [self._generate_single(prompt_messages, temperature) for _ in range(count)]
-            results = await asyncio.gather(*tasks)
-            candidates = [r for r in results if r is not None and r.sql]
+            tasks = [
+                asyncio.create_task(self._generate_single(prompt_messages, temperature))
+                for _ in range(count)
+            ]
+            candidates: List[SQLResult] = []
+            votes: Dict[str, int] = {}
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    result = await next_done
+                    if result is None or not result.sql:
+                        continue
+                    candidates.append(result)
+                    key = canonical_hash(result.sql, self.dialect.sqlglot_dialect)
+                    votes[key] = votes.get(key, 0) + 1
+                    if 0 < quorum <= votes[key]:
+                        break
+            finally:
+                pending = [t for t in tasks if not t.done()]
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
             ctx["total"] = count
             ctx["valid"] = len(candidates)
-        return candidates
+            ctx["cancelled"] = len(pending)
+        return candidates, bool(pending)
+
+    @staticmethod
+    def _latest_question(state: NL2SQLState) -> str:
+        for msg in reversed(state.messages):
+            if msg.type == HUMAN_TYPE:
+                return msg.content
+        return ""
 
     @staticmethod
     def _build_result(candidates: List[SQLResult], is_arbitration: bool) -> Dict[str, Any]:
@@ -103,7 +191,15 @@ class SQLGenerator:
     async def __call__(self, state: NL2SQLState) -> Dict[str, Any]:
         """编排 SQL 生成流程：构建 prompt → 并发生成候选 → 组装输出"""
         is_arbitration = state.needs_arbitration
-        candidate_count = 1 if is_arbitration else settings.SQL_CANDIDATE_COUNT
+        pattern = None
+        if is_arbitration:
+            candidate_count = 1
+        elif self.candidate_count is not None:
+            candidate_count = self.candidate_count
+        else:
+            candidate_count, pattern = await candidate_policy.choose(
+                self._latest_question(state), state.retry_count,
+            )
 
         logger.info(
             "sql_generator.start",
@@ -113,9 +209,17 @@ class SQLGenerator:
         )
 
         prompt_messages = self._build_prompt(state)
-        candidates = await self._generate_candidates(
-            prompt_messages, candidate_count, settings.SQL_CANDIDATE_TEMPERATURE,
-        )
+        candidates: List[SQLResult] = []
+        quorum_stopped = False
+        if settings.SQL_CANDIDATE_MULTI_CHOICE and candidate_count > 1:
+            candidates = await self._generate_choices(
+                prompt_messages, candidate_count, settings.SQL_CANDIDATE_TEMPERATURE,
+            )
+        if len(candidates) < candidate_count and not self._reached_quorum(candidates):
+            extra, quorum_stopped = await self._generate_candidates(
+                prompt_messages, candidate_count - len(candidates), settings.SQL_CANDIDATE_TEMPERATURE,
+            )
+            candidates += extra
 
         if not candidates:
             logger.error("sql_generator.all_candidates_failed")
@@ -125,4 +229,8 @@ class SQLGenerator:
                 "error_message": AgentErrorCode.LLM_ERROR.message,
             }
 
-        return self._build_result(candidates, is_arbitration)
+        result = self._build_result(candidates, is_arbitration)
+        if not is_arbitration:
+            # 提前结束时被取消的候选没有参与比对，这次选优不能作为一致率样本
+            result["candidate_pattern"] = None if quorum_stopped else pattern
+        return result
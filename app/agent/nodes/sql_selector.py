@@ -1,15 +1,20 @@
 import asyncio
+import uuid
 from typing import Any, Dict, List
 
-import sqlglot
+import xxhash
 from sqlglot import exp
 
+from app.agent.candidate_policy import candidate_policy
 from app.agent.states import NL2SQLState
+from app.core.cache import candidate_result_cache
+from app.core.config import SelectorCompareMode, settings
 from app.core.database import business_db
 from app.core.logger import logger
 from app.schemas.agent import (
     AgentErrorCode, CandidateExecResult, SQLResult, ValidatedCandidate,
 )
+from app.utils.sql_parser import parse_sql
 from app.utils.timing import log_elapsed
 
 
@@ -17,6 +22,7 @@ class SQLSelector:
     """从校验通过的候选中选出最优 SQL"""
 
     _COMPARE_LIMIT = 50
+    _VALUE_SEPARATOR = "\x1f"
 
     def __init__(self):
         self.db = business_db
@@ -25,7 +31,7 @@ class SQLSelector:
     def _ensure_deterministic_sample(self, sql: str, limit: int) -> str:
         """为 SQL 注入确定性 ORDER BY 并添加/收紧 LIMIT，确保样本可比"""
         try:
-            tree = sqlglot.parse_one(sql, dialect=self.dialect.sqlglot_dialect)
+            tree = parse_sql(sql, self.dialect.sqlglot_dialect)
 
             if not tree.args.get("order"):
                 select_exprs = tree.args.get("expressions", [])
@@ -37,26 +43,88 @@ class SQLSelector:
                 if order_cols:
                     tree.set("order", exp.Order(expressions=order_cols))
 
-            existing_limit = tree.args.get("limit")
-            if existing_limit:
-                existing_val = int(existing_limit.expression.this)
-                if existing_val <= limit:
-                    return tree.sql(dialect=self.dialect.sqlglot_dialect)
-            tree.set("limit", exp.Limit(expression=exp.Literal.number(limit)))
-            return tree.sql(dialect=self.dialect.sqlglot_dialect)
+            return self.dialect.apply_row_limit(tree.sql(dialect=self.dialect.sqlglot_dialect), limit)
         except Exception as e:
             logger.warning("sql_selector.ensure_deterministic_sample_failed", sql=sql, error=str(e))
             return sql
 
-    async def _execute_for_comparison(self, sql: str) -> list[dict] | None:
-        """注入确定性排序和 LIMIT 后执行单条 SQL 获取样本结果，失败返回 None"""
-        limited_sql = self._ensure_deterministic_sample(sql, self._COMPARE_LIMIT)
+    @classmethod
+    def _fetch_limit(cls) -> int:
+        """复用模式下按执行上限多取一行以判断结果是否完整，否则仅取比对样本"""
+        if settings.SQL_SELECTOR_REUSE_EXECUTION:
+            return settings.EXECUTOR_MAX_ROWS + 1
+        return cls._COMPARE_LIMIT
+
+    async def _run_comparison_query(self, sql: str, columns: list[str] | None = None) -> list[dict] | None:
         try:
-            return await self.db.execute_query(limited_sql)
+            return await self.db.execute_query(sql, timeout=settings.SQL_SELECTOR_TIMEOUT, columns=columns)
         except Exception as e:
             logger.warning("sql_selector.comparison_execution_failed", error=str(e))
             return None
 
+    async def _execute_for_comparison(self, candidate: ValidatedCandidate) -> CandidateExecResult | None:
+        """执行单条候选获取比对结果，失败返回 None
+
+        校验和模式下在服务端对完整结果集计算 (row_count, checksum)，只回传一行；
+        方言无法构建校验和查询时退化为注入确定性排序和 LIMIT 的样本执行
+        """
+        if settings.SQL_SELECTOR_COMPARE_MODE == SelectorCompareMode.CHECKSUM:
+            checksum_sql = self.dialect.build_checksum_sql(candidate.sql)
+            if checksum_sql:
+                rows = await self._run_comparison_query(checksum_sql)
+                if rows is None:
+                    return None
+                return CandidateExecResult(
+                    sql=candidate.sql,
+                    explain=candidate.explain,
+                    exec_result=rows,
+                    votes=candidate.votes,
+                    fingerprint=self._fingerprint(rows),
+                )
+            logger.info("sql_selector.checksum_unsupported")
+
+        limited_sql = self._ensure_deterministic_sample(candidate.sql, self._fetch_limit())
+        columns: list[str] = []
+        rows = await self._run_comparison_query(limited_sql, columns)
+        if rows is None:
+            return None
+        return await self._build_exec_result(candidate, rows, columns)
+
+    @classmethod
+    async def _build_exec_result(
+        cls, candidate: ValidatedCandidate, rows: list[dict], columns: list[str],
+    ) -> CandidateExecResult:
+        """以确定性排序后的前缀作为比对样本；复用模式下结果未超出执行上限时将 (列名, 完整结果) 存入进程内缓存，
+        状态中只保留缓存键，避免大结果集随检查点持久化
+        """
+        result_key = None
+        if settings.SQL_SELECTOR_REUSE_EXECUTION and len(rows) <= settings.EXECUTOR_MAX_ROWS:
+            result_key = uuid.uuid4().hex
+            await candidate_result_cache.set(result_key, (columns, rows))
+        sample = rows[:cls._COMPARE_LIMIT]
+        return CandidateExecResult(
+            sql=candidate.sql,
+            explain=candidate.explain,
+            exec_result=sample,
+            votes=candidate.votes,
+            result_key=result_key,
+            fingerprint=cls._fingerprint(sample),
+        )
+
+    @classmethod
+    def _fingerprint(cls, rows: list[dict]) -> str:
+        """计算结果集的多重集指纹：行内值排序忽略列序和别名，行摘要排序忽略行序"""
+        row_digests = sorted(
+            xxhash.xxh3_64_intdigest(
+                cls._VALUE_SEPARATOR.join(sorted(str(v) for v in row.values())).encode()
+            )
+            for row in rows
+        )
+        hasher = xxhash.xxh3_128(len(rows).to_bytes(8, "little"))
+        for digest in row_digests:
+            hasher.update(digest.to_bytes(8, "little"))
+        return hasher.hexdigest()
+
     @staticmethod
     def _results_equivalent(a: list[dict], b: list[dict]) -> bool:
         """比较两个结果集是否等价，忽略行序、列序和别名"""
@@ -75,33 +143,35 @@ class SQLSelector:
         self, candidates: List[ValidatedCandidate],
     ) -> List[CandidateExecResult]:
         """并发执行所有候选，过滤执行失败的，返回带结果的候选列表"""
-        tasks = [self._execute_for_comparison(c.sql) for c in candidates]
-        results = await asyncio.gather(*tasks)
-        return [
-            CandidateExecResult(
-                sql=candidates[i].sql,
-                explain=candidates[i].explain,
-                exec_result=results[i],
-            )
-            for i in range(len(candidates))
-            if results[i] is not None
-        ]
+        results = await asyncio.gather(*(self._execute_for_comparison(c) for c in candidates))
+        return [r for r in results if r is not None]
 
-    def _find_majority(self, entries: List[CandidateExecResult]) -> CandidateExecResult | None:
-        """按结果集分组投票，返回多数组中开销最低的候选，无多数返回 None"""
+    def _group_results(self, entries: List[CandidateExecResult]) -> list[list[int]]:
+        """按结果集指纹分组，返回各组的下标；指纹相同时再做一次精确比对，防止哈希碰撞导致误判"""
+        buckets: dict[str, list[list[int]]] = {}
         groups: list[list[int]] = []
         for i, entry in enumerate(entries):
-            placed = False
-            for group in groups:
+            fingerprint = entry.fingerprint or self._fingerprint(entry.exec_result)
+            bucket = buckets.setdefault(fingerprint, [])
+            for group in bucket:
                 if self._results_equivalent(entry.exec_result, entries[group[0]].exec_result):
                     group.append(i)
-                    placed = True
                     break
-            if not placed:
-                groups.append([i])
+            else:
+                group = [i]
+                bucket.append(group)
+                groups.append(group)
+        return groups
+
+    def _find_majority(self, entries: List[CandidateExecResult]) -> CandidateExecResult | None:
+        """按结果集分组投票，每个结果按其代表的候选票数计票，返回多数组中开销最低的候选，无多数返回 None"""
+        groups = self._group_results(entries)
+
+        def votes(group: list[int]) -> int:
+            return sum(entries[i].votes for i in group)
 
-        majority = max(groups, key=len)
-        if len(majority) <= 1 < len(groups):
+        majority = max(groups, key=votes)
+        if votes(majority) <= 1 < len(groups):
             return None
 
         group_entries = [entries[i] for i in majority]
@@ -138,6 +208,14 @@ class SQLSelector:
         logger.info("sql_selector.no_majority_after_arbitration")
         return {"candidate_exec_results": all_results}
 
+    @staticmethod
+    async def _record_agreement(
+        state: NL2SQLState, candidates: List[ValidatedCandidate], agreed: bool,
+    ) -> None:
+        """首轮多候选选优时记录结果是否完全一致，供候选数量策略学习；单候选无从比较不记录"""
+        if state.candidate_pattern and sum(c.votes for c in candidates) > 1:
+            await candidate_policy.record(state.candidate_pattern, agreed)
+
     async def __call__(self, state: NL2SQLState) -> Dict[str, Any]:
         new_candidates = state.validated_candidates
         previous_results = list(state.candidate_exec_results)
@@ -150,10 +228,20 @@ class SQLSelector:
                 "error_message": AgentErrorCode.NO_SQL.message,
             }
 
+        if len(new_candidates) == 1 and not previous_results:
+            candidate = new_candidates[0]
+            logger.info("sql_selector.single_candidate_skip_execution", votes=candidate.votes)
+            await self._record_agreement(state, new_candidates, agreed=True)
+            return {"sql_result": SQLResult(sql=candidate.sql)}
+
         async with log_elapsed(logger, "sql_selector.execution_completed") as ctx:
             new_results = await self._execute_candidates(new_candidates)
             ctx["new_executed"] = len(new_results)
 
+        if not previous_results and len(new_results) == len(new_candidates):
+            agreed = len(self._group_results(new_results)) == 1
+            await self._record_agreement(state, new_candidates, agreed=agreed)
+
         all_results = previous_results + new_results
 
         if not all_results:
@@ -1,11 +1,15 @@
 import asyncio
+import re
 from typing import Any, Dict, List, Optional, Tuple
 
-import sqlglot
 from sqlglot import exp
+from sqlglot.errors import OptimizeError
+from sqlglot.optimizer.qualify import qualify
 from sqlalchemy.exc import OperationalError
 
 from app.agent.states import NL2SQLState
+from app.core.cache import explain_cache, schema_fingerprint
+from app.core.catalog import schema_catalog
 from app.core.config import settings
 from app.core.database import business_db
 from app.core.dialect import ExplainAnalysis
@@ -13,30 +17,100 @@ from app.core.logger import logger
 from app.schemas.agent import (
     AgentErrorCode, PerformanceResult, SQLResult, SyntaxResult, ValidatedCandidate,
 )
+from app.utils.sql_canonical import canonical_hash
+from app.utils.sql_parser import aparse_sql, parse_sql
 
 
 class SQLValidator:
     """校验 SQL 候选：语法检查、EXPLAIN 验证、性能分析"""
 
+    _UNRESOLVED_MARKERS = ("could not be resolved", "Unknown column")
+    _UNRESOLVED_COLUMN_PATTERN = re.compile(r"Column '([^']+)' could not be resolved")
+
     def __init__(self):
         self.db = business_db
         self.dialect = business_db.dialect
 
-    def _parse_syntax(self, sql: str) -> SyntaxResult:
-        """使用 sqlglot 校验 SQL 语法，非 SELECT 视为失败"""
+    async def _parse_syntax(self, sql: str) -> SyntaxResult:
+        """使用 sqlglot 校验 SQL 语法，非 SELECT 视为失败；解析结果进入共享缓存供后续节点复用"""
         try:
-            ast = sqlglot.parse_one(sql, dialect=self.dialect.sqlglot_dialect)
+            ast = await aparse_sql(sql, self.dialect.sqlglot_dialect, copy=False)
         except Exception as e:
             return SyntaxResult(is_ok=False, error=f"Syntax Error: {e}")
         if not isinstance(ast, exp.Select):
             return SyntaxResult(is_ok=False, error=AgentErrorCode.ONLY_SELECT.message)
         return SyntaxResult(is_ok=True)
 
+    def _check_catalog(self, sql: str, fingerprint: str) -> Optional[str]:
+        """用本地 schema 目录解析表名和列名，引用不存在的标识符时返回错误信息
+
+        跨库引用、表函数等目录无法覆盖的情况返回 None，交由 EXPLAIN 判定
+        """
+        if (
+            not settings.SQL_CATALOG_CHECK_ENABLED
+            or not schema_catalog.is_loaded
+            or not schema_catalog.is_fresh(fingerprint)
+        ):
+            return None
+
+        dialect = self.dialect.sqlglot_dialect
+        try:
+            tree = parse_sql(sql, dialect)
+        except Exception:
+            return None
+
+        tables = list(tree.find_all(exp.Table))
+        if any(not isinstance(t.this, exp.Identifier) or t.db or t.catalog for t in tables):
+            return None
+        cte_names = {cte.alias_or_name.lower() for cte in tree.find_all(exp.CTE)}
+        unknown = sorted({
+            t.name for t in tables
+            if t.name.lower() not in cte_names and not schema_catalog.has_table(t.name)
+        })
+        if unknown:
+            return f"Unknown table(s): {', '.join(unknown)}"
+
+        for identifier in tree.find_all(exp.Identifier):
+            identifier.set("this", identifier.this.lower())
+        try:
+            qualify(
+                tree,
+                schema=schema_catalog.sqlglot_schema(dialect),
+                dialect=dialect,
+                validate_qualify_columns=True,
+                quote_identifiers=False,
+                identify=False,
+            )
+        except OptimizeError as e:
+            message = str(e)
+            if not any(marker in message for marker in self._UNRESOLVED_MARKERS):
+                return None
+            return self._ambiguity_error(message, tables, cte_names) or message
+        except Exception as e:
+            logger.debug("sql_validator.catalog_check_skipped", error=str(e))
+            return None
+        return None
+
+    def _ambiguity_error(self, message: str, tables: List[exp.Table], cte_names: set[str]) -> Optional[str]:
+        """未限定的列在查询引用的多张表中都存在时属于歧义而非缺失，返回歧义错误，不应触发定向补检"""
+        match = self._UNRESOLVED_COLUMN_PATTERN.search(message)
+        if not match:
+            return None
+        column = match.group(1).lower()
+        owners = sorted({
+            t.name for t in tables
+            if t.name.lower() not in cte_names
+            and column in (c.lower() for c in schema_catalog.get_table(t.name).columns)
+        })
+        if len(owners) < 2:
+            return None
+        return f"Ambiguous column '{column}' exists in tables: {', '.join(owners)}; qualify it with a table alias"
+
     async def _execute_explain(self, sql: str) -> Tuple[Optional[ExplainAnalysis], Optional[str]]:
         """执行 EXPLAIN，返回分析结果或错误信息；系统级错误向上抛出"""
         explain_sql = self.dialect.build_explain_sql(sql)
         try:
-            rows = await self.db.execute_query(explain_sql)
+            rows = await self.db.execute_query(explain_sql, timeout=settings.EXPLAIN_TIMEOUT)
             analysis = self.dialect.parse_explain(rows, settings.EXPLAIN_MAX_ROWS)
             return analysis, None
         except OperationalError as e:
@@ -44,21 +118,51 @@ class SQLValidator:
                 raise
             return None, str(e)
 
+    async def _cached_explain(
+        self, sql: str, key: str, fingerprint: str,
+    ) -> Tuple[Optional[ExplainAnalysis], Optional[str]]:
+        """按 schema 指纹与规范化 SQL 摘要查询 EXPLAIN 缓存，未命中时执行并仅缓存成功结果"""
+        if not settings.EXPLAIN_CACHE_ENABLED:
+            return await self._execute_explain(sql)
+
+        cache_key = f"{fingerprint}:{self.dialect.sqlglot_dialect}:{key}"
+        cached = await explain_cache.get(cache_key)
+        if cached is not None:
+            logger.debug("sql_validator.explain_cache_hit", key=cache_key)
+            return ExplainAnalysis.model_validate(cached), None
+
+        analysis, error = await self._execute_explain(sql)
+        if analysis is not None:
+            await explain_cache.set(cache_key, analysis.model_dump())
+        return analysis, error
+
     async def _validate_single(
-        self, sql: str,
+        self, sql: str, key: str, fingerprint: str,
     ) -> Tuple[SyntaxResult, Optional[ExplainAnalysis], Optional[str]]:
         """对单条 SQL 依次执行语法、EXPLAIN 校验，前一步失败则后续跳过"""
-        syntax = self._parse_syntax(sql)
+        syntax = await self._parse_syntax(sql)
         if not syntax.is_ok:
             return syntax, None, None
-        analysis, error = await self._execute_explain(sql)
+        catalog_error = self._check_catalog(sql, fingerprint)
+        if catalog_error:
+            logger.info("sql_validator.catalog_rejected", error=catalog_error)
+            return syntax, None, catalog_error
+        analysis, error = await self._cached_explain(sql, key, fingerprint)
         if error:
             return syntax, None, error
         return syntax, analysis, None
 
+    def _dedup_candidates(self, candidates: List[SQLResult]) -> List[Tuple[SQLResult, str, int]]:
+        """按规范化 SQL 摘要去重，返回 (代表候选, 摘要, 票数)，保持首次出现顺序"""
+        groups: Dict[str, List[SQLResult]] = {}
+        for candidate in candidates:
+            key = canonical_hash(candidate.sql, self.dialect.sqlglot_dialect)
+            groups.setdefault(key, []).append(candidate)
+        return [(members[0], key, len(members)) for key, members in groups.items()]
+
     def _classify_results(
         self,
-        candidates: List[SQLResult],
+        candidates: List[Tuple[SQLResult, str, int]],
         validation_results: List[Tuple[SyntaxResult, Optional[ExplainAnalysis], Optional[str]]],
     ) -> Tuple[List[ValidatedCandidate], Optional[str], Optional[str]]:
         """将校验结果分类为合法候选与首个各类错误"""
@@ -67,7 +171,8 @@ class SQLValidator:
         first_explain_error: Optional[str] = None
 
         for i, (syntax, analysis, explain_error) in enumerate(validation_results):
-            sql = candidates[i].sql
+            candidate, key, votes = candidates[i]
+            sql = candidate.sql
             if not syntax.is_ok:
                 if first_syntax_error is None:
                     first_syntax_error = syntax.error
@@ -76,7 +181,7 @@ class SQLValidator:
                 if first_explain_error is None:
                     first_explain_error = explain_error
                 continue
-            valid.append(ValidatedCandidate(sql=sql, explain=analysis))
+            valid.append(ValidatedCandidate(sql=sql, explain=analysis, canonical_hash=key, votes=votes))
 
         return valid, first_syntax_error, first_explain_error
 
@@ -94,11 +199,13 @@ class SQLValidator:
                 None, None, first_syntax_error,
             )
         if first_explain_error:
-            return self._build_fail_result(
+            result = self._build_fail_result(
                 state,
                 SyntaxResult(is_ok=True),
                 first_explain_error, None, first_explain_error,
             )
+            result["missing_identifiers"] = self.dialect.extract_missing_identifiers(first_explain_error)
+            return result
         return {
             "validated_candidates": [],
             "is_success": False,
@@ -141,12 +248,21 @@ class SQLValidator:
                 "error_message": AgentErrorCode.NO_SQL.message,
             }
 
-        logger.info("sql_validator.start", candidate_count=len(candidates), retry_count=state.retry_count)
+        unique_candidates = self._dedup_candidates(candidates)
+        logger.info(
+            "sql_validator.start",
+            candidate_count=len(candidates),
+            unique_count=len(unique_candidates),
+            retry_count=state.retry_count,
+        )
 
+        fingerprint = await schema_fingerprint.get()
         validation_results = await asyncio.gather(
-            *(self._validate_single(c.sql) for c in candidates)
+            *(self._validate_single(c.sql, key, fingerprint) for c, key, _ in unique_candidates)
+        )
+        valid, first_syntax_error, first_explain_error = self._classify_results(
+            unique_candidates, validation_results,
         )
-        valid, first_syntax_error, first_explain_error = self._classify_results(candidates, validation_results)
 
         if not valid:
             logger.warning("sql_validator.all_candidates_failed", candidate_count=len(candidates))
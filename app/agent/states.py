@@ -29,6 +29,7 @@ class NL2SQLState(BaseModel):
     candidate_exec_results: List[CandidateExecResult] = Field(default_factory=list, description="已执行候选的比对结果，由 sql_selector 写入")
     sql_result: Optional[SQLResult] = Field(default=None, description="选优后的最终 SQL")
     needs_arbitration: bool = Field(default=False, description="结果不一致，需要仲裁")
+    candidate_pattern: Optional[str] = Field(default=None, description="本轮问题的复杂度分桶，由 sql_generator 写入，sql_selector 据此记录候选一致率")
 
     # 循环计数
     retry_count: int = Field(default=0, description="SQL 校验失败重试次数")
@@ -38,14 +39,20 @@ class NL2SQLState(BaseModel):
     # SQL 校验结果（由 sql_validator 节点写入）
     syntax_result: Optional[SyntaxResult] = Field(default=None, description="SQL语法校验结果")
     explain_error: Optional[str] = Field(default=None, description="EXPLAIN执行SQL层面错误信息")
+    missing_identifiers: List[str] = Field(default_factory=list, description="从 explain_error 中提取的不存在的表名/列名，供 schema_retriever 定向补充")
     performance_result: Optional[PerformanceResult] = Field(default=None, description="SQL性能校验结果")
 
     # SQL 执行结果（由 executor 节点写入）
     execute_result: Optional[List[Dict[str, Any]]] = Field(default=None, description="SQL执行结果集")
+    execute_columns: List[str] = Field(default_factory=list, description="结果集列名，取自游标元数据，结果为空时同样可用")
+    execute_truncated: bool = Field(default=False, description="执行结果是否因超出 EXECUTOR_MAX_ROWS 被截断")
 
     # 图表（由 chart_advisor 节点写入）
     chart_option: Optional[Dict[str, Any]] = Field(default=None, description="ECharts option JSON")
-    chart_message: Optional[str] = Field(default=None, description="图表生成失败时的原因说明，由 result_summarizer 纳入总结")
+    chart_message: Optional[str] = Field(default=None, description="图表生成失败时的原因说明")
+
+    # 总结（由 result_summarizer 写入，finalize 组装为最终消息）
+    summary: Optional[str] = Field(default=None, description="查询结果的自然语言总结")
 
     # 终态（由 sql_validator / executor 写入）
     is_success: Optional[bool] = Field(default=None, description="最终执行是否成功")
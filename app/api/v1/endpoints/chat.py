@@ -8,14 +8,23 @@ from app.schemas.chat import (
     ConversationDetailResponse,
     ConversationListItem,
     ConversationListRequest,
+    GraphMode,
     SchemaSyncResponse,
     SendMessageRequest,
+    SQLQueryRequest,
+    SQLQueryResponse,
 )
 from app.services import registry
 
 router = APIRouter()
 
 
+def _select_graph(request: Request, mode: GraphMode):
+    if mode == GraphMode.FAST:
+        return request.app.state.nl2sql_fast_graph
+    return request.app.state.nl2sql_graph
+
+
 @router.post("/conversations/create")
 async def create_conversation(request: Request) -> Response[ConversationListItem]:
     user_id = int(request.state.user_id)
@@ -57,8 +66,8 @@ async def delete_conversation(
 
 @router.post("/conversations/messages/send")
 async def send_message(request: Request, body: SendMessageRequest):
-    """发送消息并以 SSE 事件流返回 graph 执行进度与结果"""
-    graph = request.app.state.nl2sql_graph
+    """发送消息并以 SSE 事件流返回 graph 执行进度与结果，mode 选择完整或快速模式"""
+    graph = _select_graph(request, body.mode)
     user_id = int(request.state.user_id)
     stream = await registry.chat_service.send_message_stream(
         graph, body.conversation_id, user_id, body.content
@@ -70,8 +79,19 @@ async def send_message(request: Request, body: SendMessageRequest):
     )
 
 
+@router.post("/conversations/messages/query")
+async def query_sql(request: Request, body: SQLQueryRequest) -> Response[SQLQueryResponse]:
+    """非流式执行到 SQL 执行为止，返回 SQL 与结果集，不生成图表和总结"""
+    graph = request.app.state.nl2sql_sql_graph
+    user_id = int(request.state.user_id)
+    result = await registry.chat_service.query(
+        graph, body.conversation_id, user_id, body.content, columnar=body.columnar
+    )
+    return Response(data=result)
+
+
 @router.post("/schema/sync")
 async def sync_schema() -> Response[SchemaSyncResponse]:
-    """从业务数据库全量同步表结构到 Milvus"""
+    """从业务数据库全量同步表结构到向量库"""
     table_count = await registry.schema_service.sync()
     return Response(data=SchemaSyncResponse(table_count=table_count))
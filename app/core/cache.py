@@ -0,0 +1,103 @@
+import hashlib
+from typing import Iterable, Optional
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.core.redis import redis_client
+from app.core.singleton import Singleton
+from app.utils.cache import LRUCache, MultiLevelCache
+
+
+class SchemaFingerprint(Singleton):
+    """最近一次 schema 同步的指纹，存于 Redis 供多实例共享，作为 schema 相关缓存键的版本号"""
+
+    UNKNOWN = "unknown"
+    _REDIS_KEY = "schema:fingerprint"
+
+    def __init__(self) -> None:
+        self._local: Optional[str] = None
+
+    @staticmethod
+    def compute(ddls: Iterable[str]) -> str:
+        """对全部表 DDL 排序后计算 sha256，与表的读取顺序无关"""
+        hasher = hashlib.sha256()
+        for ddl in sorted(ddls):
+            hasher.update(ddl.encode())
+            hasher.update(b"\0")
+        return hasher.hexdigest()[:16]
+
+    async def get(self) -> str:
+        """读取当前指纹，Redis 不可用时退化为本实例最近一次写入的值"""
+        try:
+            value = await redis_client.get(self._REDIS_KEY)
+            if value:
+                self._local = value
+                return value
+        except Exception as e:
+            logger.warning("schema_fingerprint.get_failed", error=str(e))
+        return self._local or self.UNKNOWN
+
+    async def update(self, fingerprint: str) -> bool:
+        """写入新指纹，返回是否与之前不同"""
+        previous = await self.get()
+        self._local = fingerprint
+        if previous == fingerprint:
+            return False
+        try:
+            await redis_client.set(self._REDIS_KEY, fingerprint)
+        except Exception as e:
+            logger.warning("schema_fingerprint.set_failed", error=str(e))
+        return True
+
+
+schema_fingerprint = SchemaFingerprint()
+
+explain_cache = MultiLevelCache(
+    redis=redis_client,
+    key_prefix="explain",
+    l1_maxsize=settings.EXPLAIN_CACHE_L1_SIZE,
+    l2_ttl=settings.EXPLAIN_CACHE_TTL,
+)
+
+# 查询文本 → 查询向量；向量只取决于嵌入模型，键中带模型名，schema 变化时无需失效
+embedding_cache = MultiLevelCache(
+    redis=redis_client,
+    key_prefix="embedding",
+    l1_maxsize=settings.EMBEDDING_CACHE_L1_SIZE,
+    l1_max_bytes=settings.EMBEDDING_CACHE_L1_BYTES,
+    l1_ttl=settings.EMBEDDING_CACHE_TTL,
+    l2_ttl=settings.EMBEDDING_CACHE_TTL,
+)
+
+# (schema 指纹, k, 查询向量摘要) → 命中的表结构 DDL 列表
+ann_cache = MultiLevelCache(
+    redis=redis_client,
+    key_prefix="ann",
+    l1_maxsize=settings.EMBEDDING_CACHE_L1_SIZE,
+    l1_ttl=settings.ANN_CACHE_TTL,
+    l2_ttl=settings.ANN_CACHE_TTL,
+)
+
+# 按会话缓存上次检索的 (schema 指纹, 查询向量, 命中表结构)，仅在本进程内复用
+retrieval_cache = LRUCache(
+    maxsize=settings.SCHEMA_RETRIEVAL_CACHE_SIZE,
+    default_ttl=settings.SCHEMA_RETRIEVAL_CACHE_TTL,
+)
+
+# 选优阶段完整执行的候选结果，键写入 CandidateExecResult.result_key，executor 复用后清除；
+# 结果集可能较大，不放入图状态以免随检查点持久化
+candidate_result_cache = LRUCache(
+    maxsize=1000,
+    default_ttl=settings.SQL_SELECTOR_REUSE_CACHE_TTL,
+    max_bytes=settings.SQL_SELECTOR_REUSE_CACHE_BYTES,
+)
+
+
+async def invalidate_schema_caches() -> None:
+    """schema 变化后清理依赖 schema 的缓存；键中已带指纹，旧条目即使残留也不会被命中"""
+    await retrieval_cache.clear()
+    await explain_cache.l1.clear()
+    await ann_cache.l1.clear()
+    removed = await explain_cache.invalidate_pattern("*")
+    ann_removed = await ann_cache.invalidate_pattern("*")
+    logger.info("schema_cache.invalidated", explain_removed=removed, ann_removed=ann_removed)
@@ -0,0 +1,139 @@
+import asyncio
+import difflib
+from typing import Collection, Dict, List, Optional
+
+from sqlglot.schema import MappingSchema
+
+from app.core.cache import schema_fingerprint
+from app.core.database import TableMeta, business_db
+from app.core.logger import logger
+from app.core.singleton import Singleton
+from app.utils.bm25 import BM25Index, tokenize
+
+
+class SchemaCatalog(Singleton):
+    """业务库表结构的进程内只读快照，供 SQL 校验在本地解析表名和列名
+
+    表名与列名统一按小写存储，匹配时大小写不敏感，宁可漏判也不误判合法 SQL
+    """
+
+    _FUZZY_CUTOFF = 0.6
+    _FUZZY_LIMIT = 3
+    _COLUMN_MATCH_LIMIT = 3
+
+    def __init__(self) -> None:
+        self._tables: Dict[str, TableMeta] = {}
+        self._column_index: Dict[str, List[str]] = {}
+        self._fingerprint: Optional[str] = None
+        self._sqlglot_schemas: Dict[str, MappingSchema] = {}
+        self._lexical_metas: List[TableMeta] = []
+        self._lexical_index: Optional[BM25Index] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._fingerprint is not None
+
+    @property
+    def fingerprint(self) -> Optional[str]:
+        return self._fingerprint
+
+    def load(self, metas: List[TableMeta]) -> None:
+        """用反射结果整体替换快照"""
+        self._tables = {meta.name.lower(): meta for meta in metas}
+        self._column_index = {}
+        for name, meta in self._tables.items():
+            for column in meta.columns:
+                self._column_index.setdefault(column.lower(), []).append(name)
+        self._sqlglot_schemas = {}
+        self._lexical_metas = [meta for meta in metas if meta.ddl and meta.ddl.strip()]
+        self._lexical_index = BM25Index([self._lexical_tokens(meta) for meta in self._lexical_metas])
+        self._fingerprint = schema_fingerprint.compute(
+            meta.ddl.strip() for meta in metas if meta.ddl and meta.ddl.strip()
+        )
+        logger.info("schema_catalog.loaded", table_count=len(self._tables), fingerprint=self._fingerprint)
+
+    async def refresh(self) -> None:
+        """重新反射业务库并替换快照"""
+        self.load(await business_db.get_table_metas())
+
+    def is_fresh(self, fingerprint: str) -> bool:
+        """快照是否与最近一次同步的 schema 指纹一致；不一致时后台刷新，本次调用方应跳过本地校验
+
+        尚无同步记录（指纹未知）时信任当前快照
+        """
+        if self._fingerprint == fingerprint or fingerprint == schema_fingerprint.UNKNOWN:
+            return True
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._safe_refresh())
+        return False
+
+    async def _safe_refresh(self) -> None:
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.warning("schema_catalog.refresh_failed", error=str(e))
+
+    def has_table(self, name: str) -> bool:
+        return name.lower() in self._tables
+
+    def get_table(self, name: str) -> Optional[TableMeta]:
+        return self._tables.get(name.lower())
+
+    def table_names(self) -> List[str]:
+        return [meta.name for meta in self._tables.values()]
+
+    def lookup(self, identifier: str, query_tables: Collection[str] = ()) -> List[TableMeta]:
+        """按标识符查找相关表：先精确匹配表名、包含该列的表，都没有再按名称相似度模糊匹配
+
+        id、status 这类通用列名会命中大量表，按列匹配到的表优先取 query_tables（当前 SQL 已引用的表），
+        总数不超过 _COLUMN_MATCH_LIMIT
+        """
+        key = identifier.lower()
+        names: List[str] = []
+        if key in self._tables:
+            names.append(key)
+        columns = [key] if key in self._column_index else []
+        if not names and not columns:
+            names.extend(difflib.get_close_matches(
+                key, self._tables.keys(), n=self._FUZZY_LIMIT, cutoff=self._FUZZY_CUTOFF,
+            ))
+            columns = difflib.get_close_matches(
+                key, self._column_index.keys(), n=self._FUZZY_LIMIT, cutoff=self._FUZZY_CUTOFF,
+            )
+        names.extend(self._rank_column_tables(columns, query_tables))
+        return [self._tables[name] for name in dict.fromkeys(names)]
+
+    def _rank_column_tables(self, columns: List[str], query_tables: Collection[str]) -> List[str]:
+        """包含给定列的表名，query_tables 中的表排在前面，截取前 _COLUMN_MATCH_LIMIT 个"""
+        preferred = {name.lower() for name in query_tables}
+        names = list(dict.fromkeys(name for column in columns for name in self._column_index[column]))
+        names.sort(key=lambda name: name not in preferred)
+        return names[:self._COLUMN_MATCH_LIMIT]
+
+    @staticmethod
+    def _lexical_tokens(meta: TableMeta) -> List[str]:
+        """词法索引的文档：表名、列名与表/列注释，不含类型与约束等 DDL 噪声"""
+        return tokenize(" ".join([meta.name, *meta.columns, *meta.comments]))
+
+    def lexical_search(self, query: str, k: int) -> List[TableMeta]:
+        """按 BM25 检索与问题字面匹配的表，弥补向量检索对表名、列名字面命中的遗漏"""
+        if self._lexical_index is None:
+            return []
+        hits = self._lexical_index.search(tokenize(query), k)
+        return [self._lexical_metas[doc_id] for doc_id, _ in hits]
+
+    def sqlglot_schema(self, dialect: str) -> MappingSchema:
+        """按方言构建并缓存 sqlglot MappingSchema，表名与列名均为小写"""
+        schema = self._sqlglot_schemas.get(dialect)
+        if schema is None:
+            mapping = {
+                name: {column.lower(): col_type for column, col_type in meta.columns.items()}
+                for name, meta in self._tables.items()
+            }
+            schema = MappingSchema(mapping, dialect=dialect)
+            self._sqlglot_schemas[dialect] = schema
+        return schema
+
+
+schema_catalog = SchemaCatalog()
@@ -14,6 +14,16 @@ class CheckpointerType(str, Enum):
     POSTGRES = "postgres"
 
 
+class VectorStoreBackend(str, Enum):
+    MILVUS = "milvus"
+    LOCAL = "local"
+
+
+class SelectorCompareMode(str, Enum):
+    SAMPLE = "sample"
+    CHECKSUM = "checksum"
+
+
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(
         env_file=str(_PROJECT_ROOT / ".env"),
@@ -37,9 +47,22 @@ class Settings(BaseSettings):
     BUSINESS_DATABASE_URL: str = Field(description="业务数据库异步连接地址，支持 mysql+aiomysql / postgresql+psycopg / clickhouse+asynch")
     EXPLAIN_MAX_ROWS: int = Field(default=10000, description="EXPLAIN 预估扫描行数阈值，超过则标记为性能问题")
     EXECUTOR_MAX_ROWS: int = Field(default=1000, description="执行结果最大返回行数，超出部分截断")
+    EXECUTOR_FETCH_BATCH_SIZE: int = Field(default=500, description="服务端游标每批读取的行数")
+    EXECUTOR_TIMEOUT: int = Field(default=30, description="最终 SQL 执行超时时间（秒），由数据库端强制中止，0 表示不限制")
+    EXPLAIN_TIMEOUT: int = Field(default=10, description="EXPLAIN 执行超时时间（秒），0 表示不限制")
+    SQL_SELECTOR_TIMEOUT: int = Field(default=15, description="候选 SQL 比对执行超时时间（秒），0 表示不限制")
+    EXPLAIN_CACHE_ENABLED: bool = Field(default=True, description="是否缓存 EXPLAIN 分析结果，键为规范化 SQL 摘要与 schema 指纹")
+    EXPLAIN_CACHE_TTL: int = Field(default=3600, description="EXPLAIN 缓存在 Redis 中的过期时间（秒）")
+    EXPLAIN_CACHE_L1_SIZE: int = Field(default=1000, description="EXPLAIN 缓存本地内存层最大条目数")
+    SQL_CATALOG_CHECK_ENABLED: bool = Field(default=True, description="EXPLAIN 前先用本地 schema 目录校验表名和列名，引用不存在的标识符时直接拒绝")
+    SQL_PARSE_CACHE_SIZE: int = Field(default=512, description="进程内 SQL 解析结果（AST）缓存条目数")
+    SQL_PARSE_THREAD_THRESHOLD: int = Field(default=20000, description="SQL 长度达到该字符数时放到线程中解析，0 表示始终在事件循环中解析")
     AGENT_MAX_RETRIES: int = Field(default=3, description="SQL 校验失败最大重试次数")
     AGENT_MAX_SCHEMA_RETRIES: int = Field(default=3, description="Schema 检索最大次数")
     AGENT_MAX_FOLLOW_UPS: int = Field(default=3, description="最大追问次数")
+    FAST_MODE_TEMPLATE_SUMMARY: bool = Field(default=True, description="快速模式下使用模板文案代替 LLM 总结")
+    CHART_RULE_FAST_PATH_ENABLED: bool = Field(default=True, description="结果形态明确时直接按规则推荐图表，不调用 LLM")
+    CHART_RULE_MAX_CATEGORIES: int = Field(default=20, description="规则推荐允许的类别/系列最大基数，超过则交由 LLM 判断")
 
     # Checkpointer
     CHECKPOINTER_TYPE: CheckpointerType = Field(default=CheckpointerType.SQLITE, description="checkpointer 后端类型")
@@ -71,11 +94,39 @@ class Settings(BaseSettings):
     AGENT_RECURSION_LIMIT: int = Field(default=25, description="LangGraph 单次调用最大节点执行次数")
     SQL_CANDIDATE_COUNT: int = Field(default=2, description="SQL 候选生成数量")
     SQL_CANDIDATE_TEMPERATURE: float = Field(default=0.7, description="SQL 候选生成温度")
+    SQL_CANDIDATE_ADAPTIVE: bool = Field(default=True, description="按问题复杂度与历史一致率动态决定候选数量，SQL_CANDIDATE_COUNT 作为默认值")
+    SQL_CANDIDATE_MAX_COUNT: int = Field(default=4, description="自适应模式下复杂问题使用的候选数量")
+    SQL_CANDIDATE_MIN_SAMPLES: int = Field(default=20, description="某类问题积累到该样本数后才依据历史一致率调整候选数量")
+    SQL_CANDIDATE_EXPLORE_RATE: float = Field(default=0.1, description="一致率高的简单问题仍按默认数量生成的概率，用于持续更新统计")
+    SQL_CANDIDATE_MULTI_CHOICE: bool = Field(default=False, description="单次请求通过 n 参数生成全部候选，需后端支持 n；返回不足时并发补齐")
+    SQL_CANDIDATE_QUORUM: int = Field(default=2, description="规范化后相同的候选达到该数量即取消其余生成请求，0 表示等待全部完成")
+    SQL_SELECTOR_COMPARE_MODE: SelectorCompareMode = Field(default=SelectorCompareMode.SAMPLE, description="候选比对方式：sample 拉取样本行比对 / checksum 服务端计算完整结果集校验和")
+    SQL_SELECTOR_REUSE_EXECUTION: bool = Field(default=False, description="选优时按执行上限执行候选，结果完整时由 executor 直接复用，避免胜出 SQL 重复执行")
+    SQL_SELECTOR_REUSE_CACHE_TTL: int = Field(default=300, description="待复用的候选完整结果在进程内保留的时间（秒），executor 取用后立即清除")
+    SQL_SELECTOR_REUSE_CACHE_BYTES: int = Field(default=256 * 1024 * 1024, description="待复用的候选完整结果在进程内占用的最大字节数（估算）")
+
+    # 向量库
+    VECTOR_STORE_BACKEND: VectorStoreBackend = Field(default=VectorStoreBackend.MILVUS, description="向量库后端：milvus / local（进程内 NumPy 暴力检索，适合表数量较少的部署）")
+    LOCAL_VECTOR_STORE_PATH: str = Field(default="./vector_store", description="local 后端的索引文件目录")
 
     # Milvus
     MILVUS_URI: str = Field(default="http://localhost:19530", description="Milvus 连接地址")
     MILVUS_COLLECTION_NAME: str = Field(default="table_schemas", description="Milvus 集合名称")
     MILVUS_SEARCH_LIMIT: int = Field(default=10, description="Milvus 向量检索返回的最大表结构数量")
+    SCHEMA_HYBRID_ENABLED: bool = Field(default=True, description="是否将表名/列名/注释的 BM25 词法检索与向量检索按 RRF 融合")
+    SCHEMA_LEXICAL_LIMIT: int = Field(default=10, description="BM25 词法检索参与融合的最大表数量")
+    SCHEMA_RRF_K: int = Field(default=60, description="RRF 融合常数 k，越大各名次得分越平缓")
+    SCHEMA_PREFETCH_ENABLED: bool = Field(default=True, description="与意图解析并行预取表结构，非查询意图时丢弃")
+    SCHEMA_RETRIEVAL_WINDOW: int = Field(default=3, description="构建检索查询时使用的最近用户消息条数，更早的内容由对话摘要代替")
+    SCHEMA_RETRIEVAL_CACHE_ENABLED: bool = Field(default=True, description="是否按会话缓存检索查询向量与命中结果")
+    SCHEMA_RETRIEVAL_REUSE_THRESHOLD: float = Field(default=0.92, description="新查询与会话上次查询向量的余弦相似度不低于该值时复用上次检索结果")
+    SCHEMA_RETRIEVAL_CACHE_SIZE: int = Field(default=1000, description="检索缓存最多保留的会话数")
+    SCHEMA_RETRIEVAL_CACHE_TTL: int = Field(default=1800, description="检索缓存过期时间（秒）")
+    EMBEDDING_CACHE_ENABLED: bool = Field(default=True, description="是否缓存查询向量与向量检索结果")
+    EMBEDDING_CACHE_TTL: int = Field(default=86400, description="查询向量缓存过期时间（秒）")
+    EMBEDDING_CACHE_L1_SIZE: int = Field(default=2000, description="查询向量 / 检索结果缓存本地内存层最大条目数")
+    EMBEDDING_CACHE_L1_BYTES: int = Field(default=64 * 1024 * 1024, description="查询向量缓存本地内存层最大字节数（估算）")
+    ANN_CACHE_TTL: int = Field(default=3600, description="向量检索结果缓存过期时间（秒），schema 变化时随指纹失效")
     EMBEDDING_MODEL: str = Field(default="BAAI/bge-large-zh-v1.5")
 
     # 消息摘要
@@ -1,8 +1,12 @@
+import asyncio
+import uuid
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
 from typing import Any, Dict, List, Optional, Tuple
 from urllib.parse import parse_qs, urlencode, urlparse, urlunparse
 
 from sqlalchemy import MetaData, text
-from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, create_async_engine
 from sqlalchemy.schema import CreateTable
 from tortoise import Tortoise
 
@@ -87,6 +91,25 @@ class Database(Singleton):
 db = Database()
 
 
+@dataclass
+class _QueryGuard:
+    """单次业务查询的最终 SQL 与取消上下文（服务端会话标识、query tag）"""
+
+    sql: str
+    session_id: Optional[str]
+    tag: str
+
+
+@dataclass(frozen=True)
+class TableMeta:
+    """反射得到的单表元数据：DDL、列名到类型的映射，以及表与列的注释"""
+
+    name: str
+    ddl: str
+    columns: Dict[str, str]
+    comments: Tuple[str, ...] = ()
+
+
 class BusinessDatabase(Singleton):
     """业务数据库连接"""
 
@@ -94,6 +117,8 @@ class BusinessDatabase(Singleton):
     _MAX_OVERFLOW = 15
     _POOL_RECYCLE = 3600
     _POOL_TIMEOUT = 10
+    _STREAM_BATCH_SIZE = 500
+    _SESSION_ID_INFO_KEY = "chat2sql_session_id"
 
     def __init__(self) -> None:
         self._engine: Optional[AsyncEngine] = None
@@ -128,21 +153,118 @@ class BusinessDatabase(Singleton):
         self._dialect = None
         logger.info("Business database disconnected")
 
-    async def execute_query(self, sql: str) -> List[Dict[str, Any]]:
-        async with self._engine.connect() as conn:
-            result = await conn.execute(text(sql))
-            return [dict(row._mapping) for row in result]
+    async def execute_query(
+        self, sql: str, timeout: Optional[int] = None, columns: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """执行查询并一次性返回全部结果；timeout（秒）由数据库端强制，请求被取消时同步取消服务端查询
 
-    async def get_table_ddls(self) -> List[Tuple[str, str]]:
-        """通过 SQLAlchemy metadata 反射生成每张表的 DDL"""
+        传入 columns 时写入结果集列名（取自游标元数据，结果为空时同样可用）
+        """
+        async with self._engine.connect() as conn:
+            guard = await self._prepare_guard(conn, sql, timeout)
+            try:
+                result = await conn.execute(text(guard.sql))
+                if columns is not None:
+                    columns[:] = list(result.keys())
+                return [dict(row._mapping) for row in result]
+            except asyncio.CancelledError:
+                await asyncio.shield(self._cancel_server_query(guard))
+                raise
+
+    async def stream_query(
+        self, sql: str, batch_size: int = _STREAM_BATCH_SIZE, timeout: Optional[int] = None,
+        columns: Optional[List[str]] = None,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """通过服务端游标分批读取结果，内存占用与结果集大小无关；
+        驱动不支持服务端游标时退化为一次性读取后分批返回
+
+        传入 columns 时在读取第一批之前写入结果集列名；
+        调用方提前退出时应使用 contextlib.aclosing 包装以及时释放游标和连接
+        """
+        async with self._engine.connect() as conn:
+            guard = await self._prepare_guard(conn, sql, timeout)
+            try:
+                if not conn.dialect.supports_server_side_cursors:
+                    result = await conn.execute(text(guard.sql))
+                    if columns is not None:
+                        columns[:] = list(result.keys())
+                    for partition in result.mappings().partitions(batch_size):
+                        yield [dict(row) for row in partition]
+                    return
+
+                result = await conn.stream(text(guard.sql))
+                if columns is not None:
+                    columns[:] = list(result.keys())
+                async for partition in result.mappings().partitions(batch_size):
+                    yield [dict(row) for row in partition]
+            except asyncio.CancelledError:
+                await asyncio.shield(self._cancel_server_query(guard))
+                raise
+
+    async def _prepare_guard(
+        self, conn: AsyncConnection, sql: str, timeout: Optional[int],
+    ) -> _QueryGuard:
+        """在查询连接上设置超时并记录服务端会话标识，返回最终执行的 SQL 及取消上下文
+
+        由方言决定不限制时是否下发：会话级超时（MySQL）下发 0 以覆盖连接池中该连接上一次查询留下的值，
+        事务级超时（PostgreSQL）不下发
+        """
+        dialect = self.dialect
+        timeout_sql = dialect.build_timeout_sql(timeout or 0)
+        if timeout_sql:
+            await conn.execute(text(timeout_sql))
+        if timeout:
+            sql = dialect.apply_timeout(sql, timeout)
+
+        tag = uuid.uuid4().hex
+        return _QueryGuard(
+            sql=dialect.tag_query(sql, tag),
+            session_id=await self._get_session_id(conn),
+            tag=tag,
+        )
 
-        def _reflect(sync_conn) -> List[Tuple[str, str]]:
+    async def _get_session_id(self, conn: AsyncConnection) -> Optional[str]:
+        """获取服务端会话标识，缓存在 DBAPI 连接的 info 中，连接复用时不再查询"""
+        cached = conn.info.get(self._SESSION_ID_INFO_KEY)
+        if cached is not None:
+            return cached
+
+        session_id_sql = self.dialect.build_session_id_sql()
+        if not session_id_sql:
+            return None
+        session_id = str((await conn.execute(text(session_id_sql))).scalar())
+        conn.info[self._SESSION_ID_INFO_KEY] = session_id
+        return session_id
+
+    async def _cancel_server_query(self, guard: _QueryGuard) -> None:
+        """在独立连接上取消仍在服务端运行的查询，失败只记录日志"""
+        try:
+            cancel_sql = self.dialect.build_cancel_sql(guard.session_id, guard.tag)
+            async with self._engine.connect() as conn:
+                await conn.execute(text(cancel_sql))
+            logger.info("business_db.query_cancelled", session_id=guard.session_id, tag=guard.tag)
+        except Exception as e:
+            logger.warning("business_db.query_cancel_failed", session_id=guard.session_id, error=str(e))
+
+    async def get_table_metas(self) -> List[TableMeta]:
+        """通过 SQLAlchemy metadata 反射每张表的 DDL 与列信息"""
+
+        def _reflect(sync_conn) -> List[TableMeta]:
             metadata = MetaData()
             metadata.reflect(bind=sync_conn)
             return [
-                (
-                    table.name,
-                    str(CreateTable(table).compile(sync_conn.engine)),
+                TableMeta(
+                    name=table.name,
+                    ddl=str(CreateTable(table).compile(sync_conn.engine)),
+                    columns={
+                        column.name: column.type.compile(dialect=sync_conn.dialect)
+                        for column in table.columns
+                    },
+                    comments=tuple(
+                        comment for comment in
+                        [table.comment, *(column.comment for column in table.columns)]
+                        if comment
+                    ),
                 )
                 for table in metadata.sorted_tables
             ]
@@ -150,5 +272,9 @@ class BusinessDatabase(Singleton):
         async with self._engine.connect() as conn:
             return await conn.run_sync(_reflect)
 
+    async def get_table_ddls(self) -> List[Tuple[str, str]]:
+        """通过 SQLAlchemy metadata 反射生成每张表的 DDL"""
+        return [(meta.name, meta.ddl) for meta in await self.get_table_metas()]
+
 
 business_db = BusinessDatabase()
@@ -8,6 +8,9 @@ from urllib.parse import urlparse
 
 from pydantic import BaseModel, ConfigDict, Field
 from sqlalchemy.exc import OperationalError
+from sqlglot import exp
+
+from app.utils.sql_parser import parse_sql
 
 
 class ExplainAnalysis(BaseModel):
@@ -21,6 +24,20 @@ class ExplainAnalysis(BaseModel):
 class DialectStrategy(ABC):
     """SQL 方言策略抽象基类，所有方言相关行为由子类实现"""
 
+    _ROW_LIMIT_ALIAS = "_limited"
+    _CHECKSUM_ALIAS = "_checksum"
+    _NULL_MARKER = "<null>"
+
+    # 本地 schema 目录校验（SQLValidator._check_catalog）产生的错误，与方言无关
+    _CATALOG_MISSING_PATTERNS: tuple[re.Pattern, ...] = (
+        re.compile(r"Column '([^']+)' could not be resolved"),
+        re.compile(r"Unknown column: ([\w.]+)"),
+        re.compile(r"Unknown table\(s\): ([\w.,\s]+)"),
+    )
+    # 各方言"列/表不存在"错误的提取规则，由子类覆盖
+    _MISSING_IDENTIFIER_PATTERNS: tuple[re.Pattern, ...] = ()
+    _IDENTIFIER_SPLIT_PATTERN = re.compile(r"[\s,]+")
+
     @property
     @abstractmethod
     def name(self) -> str:
@@ -43,6 +60,102 @@ class DialectStrategy(ABC):
     def parse_explain(self, rows: list[dict], max_rows: int) -> ExplainAnalysis:
         """解析 EXPLAIN 结果行，返回方言无关的分析结果"""
 
+    def apply_row_limit(self, sql: str, limit: int) -> str:
+        """将行数上限下推到 SQL 中：无 LIMIT 时追加，已有更小的 LIMIT 时保留，
+        LIMIT BY / FETCH 等无法原地改写的形式包一层子查询再限制
+
+        Raises:
+            sqlglot.errors.ParseError: SQL 无法解析
+            ValueError: 非查询语句
+        """
+        tree = parse_sql(sql, self.sqlglot_dialect)
+        if not isinstance(tree, exp.Query):
+            raise ValueError(f"Cannot apply row limit to non-query statement: {type(tree).__name__}")
+
+        existing = tree.args.get("limit")
+        if existing is None:
+            return tree.limit(limit).sql(dialect=self.sqlglot_dialect)
+
+        existing_value = self._literal_limit_value(existing)
+        if existing_value is not None:
+            if existing_value <= limit:
+                return tree.sql(dialect=self.sqlglot_dialect)
+            return tree.limit(limit).sql(dialect=self.sqlglot_dialect)
+
+        wrapped = exp.select("*").from_(tree.subquery(self._ROW_LIMIT_ALIAS)).limit(limit)
+        return wrapped.sql(dialect=self.sqlglot_dialect)
+
+    def build_checksum_sql(self, sql: str) -> Optional[str]:
+        """构建服务端结果集校验和查询，返回单行 (row_count, checksum)，与样本比对一样不受行序、列序和别名影响；
+        方言无法为该 SQL 构建时返回 None，由调用方退化为样本比对
+
+        与样本比对仍有差异：值由数据库转为文本（DECIMAL 尾随零、浮点与时间格式可能不同于 Python str()），
+        整数与等值字符串等在两种模式下的判定不完全一致；哈希碰撞时会误判为一致
+        """
+        return None
+
+    def _checksum_columns(self, sql: str) -> Optional[list[str]]:
+        """外层校验和查询引用的列标识符；SELECT *、匿名表达式或重名列无法在外层逐列引用，返回 None"""
+        try:
+            tree = parse_sql(sql, self.sqlglot_dialect, copy=False)
+        except Exception:
+            return None
+        if not isinstance(tree, exp.Query) or any(e.is_star for e in tree.selects):
+            return None
+        names = tree.named_selects
+        if not names or "" in names or len(set(names)) != len(names):
+            return None
+        return [exp.to_identifier(name).sql(dialect=self.sqlglot_dialect) for name in names]
+
+    def build_timeout_sql(self, timeout: int) -> Optional[str]:
+        """构建查询前在同一连接上执行的超时语句（秒），0 表示不限制；方言采用内联方式或无需下发时返回 None
+
+        会话级设置会随连接留在连接池中，这类方言 0 也必须显式下发以覆盖之前的值；
+        事务级设置随事务结束失效，0 时不下发，沿用角色或数据库上配置的默认值
+        """
+        return None
+
+    def apply_timeout(self, sql: str, timeout: int) -> str:
+        """将超时设置内联到 SQL 中（秒），默认原样返回"""
+        return sql
+
+    def build_session_id_sql(self) -> Optional[str]:
+        """查询当前连接服务端会话标识的语句，用于取消查询；返回 None 表示以 query tag 定位"""
+        return None
+
+    def tag_query(self, sql: str, tag: str) -> str:
+        """为 SQL 打上唯一标记，供无法按会话取消的方言定位查询，默认原样返回"""
+        return sql
+
+    @abstractmethod
+    def build_cancel_sql(self, session_id: Optional[str], tag: str) -> str:
+        """构建在另一连接上执行的取消语句，中止仍在服务端运行的查询"""
+
+    def extract_missing_identifiers(self, error: str) -> list[str]:
+        """从 EXPLAIN 或目录校验错误中提取不存在的表名/列名，去掉库名、表别名等限定前缀"""
+        identifiers: list[str] = []
+        for pattern in (*self._CATALOG_MISSING_PATTERNS, *self._MISSING_IDENTIFIER_PATTERNS):
+            for match in pattern.finditer(error):
+                for token in self._IDENTIFIER_SPLIT_PATTERN.split(match.group(1)):
+                    name = token.strip("'\"`").split(".")[-1].strip("'\"`")
+                    if name and name not in identifiers:
+                        identifiers.append(name)
+        return identifiers
+
+    @staticmethod
+    def _strip_terminator(sql: str) -> str:
+        return sql.strip().rstrip(";").rstrip()
+
+    @staticmethod
+    def _literal_limit_value(node: exp.Expression) -> Optional[int]:
+        """提取普通 LIMIT 的整数值，LIMIT BY、FETCH、参数化等形式返回 None"""
+        if not isinstance(node, exp.Limit) or node.args.get("expressions"):
+            return None
+        value = node.expression
+        if isinstance(value, exp.Literal) and value.is_int:
+            return int(value.this)
+        return None
+
     @staticmethod
     def _extract_raw_text(rows: list[dict]) -> str:
         lines: list[str] = []
@@ -80,6 +193,11 @@ class MySQLDialect(DialectStrategy):
         1157, 1158, 1159, 1160, 1161,
     })
 
+    _MISSING_IDENTIFIER_PATTERNS = (
+        re.compile(r"Unknown column '([^']+)'"),     # 1054 ER_BAD_FIELD_ERROR
+        re.compile(r"Table '([^']+)' doesn't exist"),  # 1146 ER_NO_SUCH_TABLE
+    )
+
     _JOIN_ALL = "ALL"
     _JOIN_INDEX = "index"
 
@@ -108,6 +226,31 @@ class MySQLDialect(DialectStrategy):
     def build_explain_sql(self, sql: str) -> str:
         return f"EXPLAIN {sql}"
 
+    def build_checksum_sql(self, sql: str) -> Optional[str]:
+        """逐列 CRC32 相加得到与列序无关的行值，再取 CRC32 打散后对所有行求和，
+        相比 BIT_XOR 不会因重复行相互抵消；需要显式列名
+        """
+        columns = self._checksum_columns(sql)
+        if columns is None:
+            return None
+        row_value = " + ".join(f"CRC32(IFNULL(CAST({col} AS CHAR), '{self._NULL_MARKER}'))" for col in columns)
+        return (
+            f"SELECT COUNT(*) AS row_count, "
+            f"COALESCE(SUM(CRC32({row_value})), 0) AS checksum "
+            f"FROM ({self._strip_terminator(sql)}) AS {self._CHECKSUM_ALIAS}"
+        )
+
+    def build_timeout_sql(self, timeout: int) -> Optional[str]:
+        # 会话变量与 MAX_EXECUTION_TIME 优化器提示等价，且对 WITH 开头的查询同样生效；
+        # 变量会随连接归还连接池，0（不限制）同样需要下发
+        return f"SET SESSION MAX_EXECUTION_TIME = {int(timeout * 1000)}"
+
+    def build_session_id_sql(self) -> Optional[str]:
+        return "SELECT CONNECTION_ID()"
+
+    def build_cancel_sql(self, session_id: Optional[str], tag: str) -> str:
+        return f"KILL QUERY {int(session_id)}"
+
     def parse_explain(self, rows: list[dict], max_rows: int) -> ExplainAnalysis:
         parsed = [
             _MySQLExplainRow.model_validate(
@@ -150,6 +293,11 @@ class PostgreSQLDialect(DialectStrategy):
         "53000", "53100", "53200", "53300", "53400",
     })
 
+    _MISSING_IDENTIFIER_PATTERNS = (
+        re.compile(r'column ("[^"]+"|[\w.]+) does not exist'),    # 42703 undefined_column
+        re.compile(r'relation ("[^"]+"|[\w.]+) does not exist'),  # 42P01 undefined_table
+    )
+
     _NODE_SEQ_SCAN = "Seq Scan"
 
     _KEY_NODE_TYPE = "Node Type"
@@ -177,6 +325,34 @@ class PostgreSQLDialect(DialectStrategy):
     def build_explain_sql(self, sql: str) -> str:
         return f"EXPLAIN (FORMAT JSON) {sql}"
 
+    def build_checksum_sql(self, sql: str) -> Optional[str]:
+        """各列 md5 排序后拼接作为行哈希，与列序无关；行哈希排序后聚合再 md5，与行序无关且能区分重复行"""
+        columns = self._checksum_columns(sql)
+        if columns is None:
+            return None
+        cells = ", ".join(f"md5(COALESCE({col}::text, '{self._NULL_MARKER}'))" for col in columns)
+        row_hashes = (
+            f"SELECT (SELECT string_agg(h, '' ORDER BY h) FROM unnest(ARRAY[{cells}]) AS h) AS row_hash "
+            f"FROM ({self._strip_terminator(sql)}) AS {self._CHECKSUM_ALIAS}"
+        )
+        return (
+            f"SELECT COUNT(*) AS row_count, "
+            f"COALESCE(md5(string_agg(row_hash, '' ORDER BY row_hash)), '') AS checksum "
+            f"FROM ({row_hashes}) AS {self._CHECKSUM_ALIAS}_rows"
+        )
+
+    def build_timeout_sql(self, timeout: int) -> Optional[str]:
+        # SET LOCAL 仅作用于当前事务，连接归还连接池后自动失效；不限制时无需下发，保留 DBA 配置的默认值
+        if not timeout:
+            return None
+        return f"SET LOCAL statement_timeout = {int(timeout * 1000)}"
+
+    def build_session_id_sql(self) -> Optional[str]:
+        return "SELECT pg_backend_pid()"
+
+    def build_cancel_sql(self, session_id: Optional[str], tag: str) -> str:
+        return f"SELECT pg_cancel_backend({int(session_id)})"
+
     def parse_explain(self, rows: list[dict], max_rows: int) -> ExplainAnalysis:
         plan = self._extract_plan(rows)
         if plan is None:
@@ -222,6 +398,7 @@ class PostgreSQLDialect(DialectStrategy):
 
 
 _CH_GRANULES_PATTERN = re.compile(r"Granules:\s*(\d+)/(\d+)")
+_CH_EXPLAIN_PATTERN = re.compile(r"^\s*EXPLAIN\b", re.IGNORECASE)
 
 
 class ClickHouseDialect(DialectStrategy):
@@ -237,6 +414,18 @@ class ClickHouseDialect(DialectStrategy):
         999,   # KEEPER_EXCEPTION
     })
 
+    _MISSING_IDENTIFIER_PATTERNS = (
+        # 47 UNKNOWN_IDENTIFIER：旧分析器 "Missing columns: 'a' 'b'"，新分析器 "Unknown expression identifier `a`"
+        re.compile(r"Missing columns: ((?:'[^']+'\s*)+)"),
+        re.compile(r"Unknown expression (?:or function )?identifier [`']([^`']+)[`']"),
+        # 60 UNKNOWN_TABLE
+        re.compile(r"Table ([\w.`]+) does(?:n't| not) exist"),
+        re.compile(r"Unknown table expression identifier [`']([^`']+)[`']"),
+    )
+
+    _SETTING_MAX_EXECUTION_TIME = "max_execution_time"
+    _QUERY_TAG_PREFIX = "chat2sql:"
+
     _NODE_READ_FROM_MERGE_TREE = "ReadFromMergeTree"
     _KEYWORD_INDEXES = "Indexes:"
 
@@ -258,6 +447,46 @@ class ClickHouseDialect(DialectStrategy):
     def build_explain_sql(self, sql: str) -> str:
         return f"EXPLAIN indexes=1 {sql}"
 
+    def build_checksum_sql(self, sql: str) -> Optional[str]:
+        """各列文本排序后的数组取 cityHash64 作为行哈希，与列序无关；对所有行求和（UInt64 溢出回绕），
+        相比 groupBitXor 不会因重复行相互抵消
+        """
+        columns = self._checksum_columns(sql)
+        if columns is None:
+            return None
+        cells = ", ".join(f"ifNull(toString({col}), '{self._NULL_MARKER}')" for col in columns)
+        return (
+            f"SELECT count() AS row_count, sum(cityHash64(arraySort([{cells}]))) AS checksum "
+            f"FROM ({self._strip_terminator(sql)}) AS {self._CHECKSUM_ALIAS}"
+        )
+
+    def apply_timeout(self, sql: str, timeout: int) -> str:
+        """以 SETTINGS max_execution_time 内联超时，EXPLAIN 等无法解析的语句直接追加"""
+        setting = exp.EQ(
+            this=exp.column(self._SETTING_MAX_EXECUTION_TIME),
+            expression=exp.Literal.number(int(timeout)),
+        )
+        tree = None
+        if not _CH_EXPLAIN_PATTERN.match(sql):
+            try:
+                tree = parse_sql(sql, self.sqlglot_dialect)
+            except Exception:
+                tree = None
+        if isinstance(tree, exp.Query):
+            tree.set("settings", [*(tree.args.get("settings") or []), setting])
+            return tree.sql(dialect=self.sqlglot_dialect)
+        return f"{sql.rstrip().rstrip(';')} SETTINGS {setting.sql(dialect=self.sqlglot_dialect)}"
+
+    def tag_query(self, sql: str, tag: str) -> str:
+        return f"/* {self._QUERY_TAG_PREFIX}{tag} */ {sql}"
+
+    def build_cancel_sql(self, session_id: Optional[str], tag: str) -> str:
+        # 排除 KILL 语句自身，否则其文本同样包含 tag
+        return (
+            f"KILL QUERY WHERE query LIKE '%{self._QUERY_TAG_PREFIX}{tag}%' "
+            f"AND query NOT LIKE 'KILL QUERY%' ASYNC"
+        )
+
     def parse_explain(self, rows: list[dict], max_rows: int) -> ExplainAnalysis:
         raw = self._extract_raw_text(rows)
         issues: list[str] = []
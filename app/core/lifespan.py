@@ -4,7 +4,8 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from phoenix.otel import register
 
-from app.agent.graph import build_graph, create_checkpointer
+from app.agent.graph import build_fast_graph, build_graph, build_sql_graph, create_checkpointer
+from app.core.catalog import schema_catalog
 from app.core.config import settings
 from app.core.database import business_db, db
 from app.core.logger import logger
@@ -33,9 +34,12 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     logger.info("Redis connected")
 
     await _auto_sync_schemas()
+    await _load_schema_catalog()
 
     async with create_checkpointer() as checkpointer:
         app.state.nl2sql_graph = build_graph(checkpointer)
+        app.state.nl2sql_fast_graph = build_fast_graph(checkpointer)
+        app.state.nl2sql_sql_graph = build_sql_graph(checkpointer)
         logger.info("NL2SQL graph initialized")
 
         yield
@@ -50,7 +54,7 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
 
 
 async def _auto_sync_schemas() -> None:
-    """启动时检查 Milvus 是否有 schema 数据，没有则自动同步"""
+    """启动时检查向量库是否有 schema 数据，没有则自动同步"""
     schema_service = SchemaService()
     if await schema_service.has_schemas():
         logger.info("Schema data already exists, skipping auto-sync")
@@ -62,3 +66,13 @@ async def _auto_sync_schemas() -> None:
         logger.info("Auto-sync completed", table_count=count)
     except Exception as e:
         logger.error("Auto-sync failed", error=str(e))
+
+
+async def _load_schema_catalog() -> None:
+    """加载本地 schema 目录供 SQL 校验使用，失败时校验退化为仅依赖 EXPLAIN"""
+    if schema_catalog.is_loaded:
+        return
+    try:
+        await schema_catalog.refresh()
+    except Exception as e:
+        logger.error("Schema catalog load failed", error=str(e))
@@ -0,0 +1,213 @@
+import json
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from app.core.logger import logger
+
+
+class LocalVectorStore(VectorStore):
+    """进程内暴力检索的向量库，适用于表数量较少（数千张以内）的部署，免去独立的 Milvus 服务
+
+    向量归一化后存为 float32 矩阵（vectors-<版本>.npy），文档、元数据及当前矩阵文件名存为 documents.json；
+    启动时以 mmap 方式加载矩阵，检索为一次矩阵乘法加 top-k。
+    每次写入生成新版本的矩阵文件，再原子替换 documents.json 切换引用，进程中断时磁盘上始终是完整的一版索引
+    """
+
+    _VECTORS_FILE = "vectors.npy"
+    _VECTORS_GLOB = "vectors*.npy"
+    _DOCUMENTS_FILE = "documents.json"
+
+    def __init__(self, embedding: Embeddings, path: str) -> None:
+        self._embedding = embedding
+        self._path = Path(path)
+        self._lock = threading.Lock()
+        self._ids: List[str] = []
+        self._texts: List[str] = []
+        self._metadatas: List[dict] = []
+        self._matrix: np.ndarray = np.empty((0, 0), dtype=np.float32)
+        # 未能加载到完整索引时为 True，同步方需清空增量记录后全量重建，否则记录中已有的文档会被跳过
+        self.needs_reindex = False
+        self._load()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _load(self) -> None:
+        documents_path = self._path / self._DOCUMENTS_FILE
+        if not documents_path.exists():
+            self.needs_reindex = True
+            return
+        content = json.loads(documents_path.read_text(encoding="utf-8"))
+        # 旧格式的 documents.json 只有文档列表，矩阵固定存于 vectors.npy
+        if isinstance(content, list):
+            records, vectors_path = content, self._path / self._VECTORS_FILE
+        else:
+            records, vectors_path = content["records"], self._path / content["vectors"]
+        if not vectors_path.exists():
+            logger.warning("local_vector_store.missing_vectors", file=vectors_path.name)
+            self.needs_reindex = True
+            return
+        matrix = np.load(vectors_path, mmap_mode="r")
+        if len(records) != matrix.shape[0]:
+            logger.warning("local_vector_store.inconsistent_files", documents=len(records), vectors=matrix.shape[0])
+            self.needs_reindex = True
+            return
+        self._ids = [r["id"] for r in records]
+        self._texts = [r["text"] for r in records]
+        self._metadatas = [r["metadata"] for r in records]
+        self._matrix = matrix
+        logger.info("local_vector_store.loaded", count=len(self._ids))
+
+    def _persist(self) -> None:
+        """矩阵写入新版本文件后原子替换 documents.json 切换引用，再清理旧版本矩阵"""
+        self._path.mkdir(parents=True, exist_ok=True)
+        records = [
+            {"id": i, "text": t, "metadata": m}
+            for i, t, m in zip(self._ids, self._texts, self._metadatas, strict=True)
+        ]
+        vectors_name = f"vectors-{uuid.uuid4().hex}.npy"
+        with open(self._path / vectors_name, "wb") as f:
+            np.save(f, np.ascontiguousarray(self._matrix, dtype=np.float32))
+            f.flush()
+            os.fsync(f.fileno())
+        documents_tmp = self._path / f"{self._DOCUMENTS_FILE}.tmp"
+        with open(documents_tmp, "w", encoding="utf-8") as f:
+            json.dump({"vectors": vectors_name, "records": records}, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(documents_tmp, self._path / self._DOCUMENTS_FILE)
+        self._remove_stale_vectors(vectors_name)
+
+    def _remove_stale_vectors(self, current: str) -> None:
+        """删除未被引用的矩阵文件，包括中断写入遗留的版本；删除失败不影响索引"""
+        for stale in self._path.glob(self._VECTORS_GLOB):
+            if stale.name == current:
+                continue
+            try:
+                stale.unlink()
+            except OSError as e:
+                logger.warning("local_vector_store.remove_stale_failed", file=stale.name, error=str(e))
+
+    def _check_dimension(self, matrix: np.ndarray, dimension: int) -> None:
+        """向量维度须与已存矩阵一致，不一致通常是更换了嵌入模型却沿用旧索引目录"""
+        if matrix.shape[0] and dimension != matrix.shape[1]:
+            raise ValueError(
+                f"Embedding dimension {dimension} does not match stored vectors ({matrix.shape[1]}) "
+                f"in {self._path}; rebuild the index after changing the embedding model"
+            )
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        *,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+        if len(metadatas) != len(texts) or len(ids) != len(texts):
+            raise ValueError(f"Got {len(texts)} texts, {len(metadatas)} metadatas and {len(ids)} ids")
+        vectors = self._normalize(np.asarray(self._embedding.embed_documents(texts), dtype=np.float32))
+
+        with self._lock:
+            self._check_dimension(self._matrix, vectors.shape[1])
+            existing = set(ids)
+            keep = [i for i, doc_id in enumerate(self._ids) if doc_id not in existing]
+            matrix = np.asarray(self._matrix[keep]) if self._ids else np.empty((0, vectors.shape[1]), dtype=np.float32)
+            self._ids = [self._ids[i] for i in keep] + ids
+            self._texts = [self._texts[i] for i in keep] + texts
+            self._metadatas = [self._metadatas[i] for i in keep] + list(metadatas)
+            self._matrix = np.vstack([matrix, vectors])
+            self._persist()
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return False
+        with self._lock:
+            removed = set(ids)
+            keep = [i for i, doc_id in enumerate(self._ids) if doc_id not in removed]
+            if len(keep) == len(self._ids):
+                return True
+            self._ids = [self._ids[i] for i in keep]
+            self._texts = [self._texts[i] for i in keep]
+            self._metadatas = [self._metadatas[i] for i in keep]
+            self._matrix = np.asarray(self._matrix[keep])
+            self._persist()
+        return True
+
+    def get_by_ids(self, ids: Sequence[str], /) -> List[Document]:
+        wanted = set(ids)
+        return [
+            Document(id=doc_id, page_content=text, metadata=metadata)
+            for doc_id, text, metadata in zip(self._ids, self._texts, self._metadatas, strict=True)
+            if doc_id in wanted
+        ]
+
+    def similarity_search_with_score_by_vector(
+        self, embedding: List[float], k: int = 4,
+    ) -> List[Tuple[Document, float]]:
+        """矩阵乘法计算与全部向量的余弦相似度，argpartition 取 top-k"""
+        with self._lock:
+            matrix, ids, texts, metadatas = self._matrix, self._ids, self._texts, self._metadatas
+        if not ids:
+            return []
+        query = self._normalize(np.asarray(embedding, dtype=np.float32))
+        self._check_dimension(matrix, query.shape[0])
+        scores = matrix @ query
+        k = min(k, len(ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            (Document(id=ids[i], page_content=texts[i], metadata=metadatas[i]), float(scores[i]))
+            for i in top
+        ]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self._embedding.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: score
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        *,
+        ids: Optional[List[str]] = None,
+        path: str = "./vector_store",
+        **kwargs: Any,
+    ) -> "LocalVectorStore":
+        store = cls(embedding=embedding, path=path)
+        store.add_texts(texts, metadatas, ids=ids)
+        return store
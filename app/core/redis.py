@@ -133,6 +133,12 @@ class RedisClient(Singleton):
             raise ValueError("Either mapping or both key and value must be provided")
         return int(result)
 
+    async def hincrby(self, name: str, key: str, amount: int = 1) -> int:
+        """Increment hash field value by amount."""
+        client = self._ensure_connected()
+        result = await client.hincrby(name, key, amount)  # type: ignore[misc]
+        return int(result)
+
     async def hgetall(self, name: str) -> Dict[str, str]:
         """Get all fields and values in a hash."""
         client = self._ensure_connected()
@@ -1,18 +1,25 @@
-from typing import Optional
+import asyncio
+import re
+import unicodedata
+from typing import List, Optional
 
+import xxhash
 from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_milvus import Milvus
+from langchain_core.vectorstores import VectorStore
 
-from app.core.config import settings
+from app.core.cache import embedding_cache
+from app.core.config import VectorStoreBackend, settings
 from app.core.singleton import Singleton
 
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
 
 class VectorStoreManager(Singleton):
-    """管理 HuggingFaceEmbeddings 和 Milvus VectorStore 的生命周期"""
+    """管理 HuggingFaceEmbeddings 和 VectorStore 的生命周期，后端由 VECTOR_STORE_BACKEND 选择"""
 
     def __init__(self) -> None:
         self._embeddings: Optional[HuggingFaceEmbeddings] = None
-        self._vector_store: Optional[Milvus] = None
+        self._vector_store: Optional[VectorStore] = None
 
     @property
     def embeddings(self) -> HuggingFaceEmbeddings:
@@ -23,15 +30,51 @@ class VectorStoreManager(Singleton):
         return self._embeddings
 
     @property
-    def vector_store(self) -> Milvus:
+    def vector_store(self) -> VectorStore:
         if self._vector_store is None:
-            self._vector_store = Milvus(
-                embedding_function=self.embeddings,
-                connection_args={"uri": settings.MILVUS_URI},
-                collection_name=settings.MILVUS_COLLECTION_NAME,
-                auto_id=True,
-            )
+            if settings.VECTOR_STORE_BACKEND == VectorStoreBackend.LOCAL:
+                from app.core.local_vector_store import LocalVectorStore
+
+                self._vector_store = LocalVectorStore(
+                    embedding=self.embeddings,
+                    path=settings.LOCAL_VECTOR_STORE_PATH,
+                )
+            else:
+                from langchain_milvus import Milvus
+
+                self._vector_store = Milvus(
+                    embedding_function=self.embeddings,
+                    connection_args={"uri": settings.MILVUS_URI},
+                    collection_name=settings.MILVUS_COLLECTION_NAME,
+                    auto_id=True,
+                )
         return self._vector_store
 
+    def count(self) -> int:
+        """向量库中的文档数量，Milvus collection 尚未创建时为 0"""
+        vs = self.vector_store
+        if settings.VECTOR_STORE_BACKEND == VectorStoreBackend.LOCAL:
+            return len(vs)
+        col = vs.col
+        return col.num_entities if col is not None else 0
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """NFKC 归一化、压缩空白、转小写，使仅格式不同的问题共享同一个查询向量"""
+        return _WHITESPACE_PATTERN.sub(" ", unicodedata.normalize("NFKC", query)).strip().lower()
+
+    async def aembed_query(self, query: str) -> List[float]:
+        """计算查询向量，按归一化文本缓存，命中时跳过模型前向计算"""
+        if not settings.EMBEDDING_CACHE_ENABLED:
+            return await asyncio.to_thread(self.embeddings.embed_query, query)
+
+        normalized = self.normalize_query(query)
+        key = f"{settings.EMBEDDING_MODEL}:{xxhash.xxh3_128_hexdigest(normalized.encode())}"
+
+        async def compute() -> List[float]:
+            return await asyncio.to_thread(self.embeddings.embed_query, normalized)
+
+        return await embedding_cache.get_or_compute(key, compute, cache_none=False)
+
 
 vector_store_manager = VectorStoreManager()
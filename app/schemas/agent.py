@@ -86,9 +86,14 @@ class PerformanceResult(BaseModel):
 class ValidatedCandidate(BaseModel):
     sql: str = Field(..., description="SQL 语句")
     explain: ExplainAnalysis = Field(..., description="EXPLAIN 分析结果")
+    canonical_hash: Optional[str] = Field(default=None, description="规范化 SQL 摘要")
+    votes: int = Field(default=1, description="规范化后相同的候选数量，选优时计为多票")
 
 
 class CandidateExecResult(BaseModel):
     sql: str = Field(..., description="SQL 语句")
     explain: ExplainAnalysis = Field(..., description="EXPLAIN 分析结果")
     exec_result: List[Dict[str, Any]] = Field(default_factory=list, description="执行结果样本")
+    votes: int = Field(default=1, description="该结果代表的候选票数")
+    result_key: Optional[str] = Field(default=None, description="完整执行结果在进程内缓存中的键，仅在复用模式且未超出执行上限时写入，供 executor 直接复用")
+    fingerprint: Optional[str] = Field(default=None, description="执行结果样本的多重集指纹，用于分组投票")
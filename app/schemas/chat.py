@@ -14,6 +14,13 @@ class ConversationStatus(str, Enum):
     FAILED = "failed"
 
 
+class GraphMode(str, Enum):
+    """NL2SQL 执行模式"""
+
+    FULL = "full"
+    FAST = "fast"
+
+
 # --------------- Request ---------------
 
 
@@ -33,6 +40,13 @@ class ConversationDeleteRequest(BaseModel):
 class SendMessageRequest(BaseModel):
     conversation_id: int
     content: str = Field(..., min_length=1, max_length=2000)
+    mode: GraphMode = Field(default=GraphMode.FULL, description="full 多候选选优 + LLM 图表与总结；fast 单候选、规则图表，低延迟")
+
+
+class SQLQueryRequest(BaseModel):
+    conversation_id: int
+    content: str = Field(..., min_length=1, max_length=2000)
+    columnar: bool = Field(default=False, description="是否以列式返回结果：columns 与 column_values 按下标对应")
 
 
 # --------------- Response ---------------
@@ -52,6 +66,7 @@ class MessageItem(BaseModel):
     role: str = Field(..., description="user 或 assistant")
     content: str
     execute_result: Optional[List[Dict[str, Any]]] = None
+    truncated: bool = Field(default=False, description="execute_result 是否因超出行数上限被截断")
     chart_option: Optional[Dict[str, Any]] = None
 
 
@@ -65,11 +80,25 @@ class ConversationDetailResponse(BaseModel):
 
     sql: Optional[str] = None
     execute_result: Optional[List[Dict[str, Any]]] = None
+    truncated: bool = False
     chart_option: Optional[Dict[str, Any]] = None
     error_code: Optional[str] = None
     error_message: Optional[str] = None
     follow_up_question: Optional[str] = None
 
 
+class SQLQueryResponse(BaseModel):
+    status: ConversationStatus
+    sql: Optional[str] = None
+    columns: List[str] = Field(default_factory=list)
+    rows: Optional[List[Dict[str, Any]]] = Field(default=None, description="行式结果，columnar=false 时返回")
+    column_values: Optional[List[List[Any]]] = Field(default=None, description="列式结果，每列一个数组，columnar=true 时返回")
+    truncated: bool = False
+    reply: Optional[str] = Field(default=None, description="非查询意图时的直接回复")
+    error_code: Optional[str] = None
+    error_message: Optional[str] = None
+    follow_up_question: Optional[str] = None
+
+
 class SchemaSyncResponse(BaseModel):
     table_count: int
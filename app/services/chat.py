@@ -1,3 +1,4 @@
+import asyncio
 import json
 import uuid
 from typing import Any, AsyncGenerator, Dict
@@ -6,6 +7,7 @@ from langchain_core.messages import HumanMessage
 from langgraph.graph.state import CompiledStateGraph
 from langgraph.types import Command
 
+from app.agent.graph import RESULT_SUMMARIZER
 from app.core.config import settings
 from app.core.logger import logger
 from app.vars.vars import HUMAN_TYPE, ROLE_ASSISTANT, ROLE_USER
@@ -17,6 +19,7 @@ from app.schemas.chat import (
     ConversationListItem,
     ConversationStatus,
     MessageItem,
+    SQLQueryResponse,
 )
 
 
@@ -53,6 +56,7 @@ class ChatService:
         messages: list[MessageItem] = []
         sql = None
         execute_result = None
+        truncated = False
         chart_option = None
         error_code = None
         error_message = None
@@ -67,6 +71,7 @@ class ChatService:
                 kwargs = getattr(msg, "additional_kwargs", None) or {}
                 if kwargs.get("execute_result"):
                     item.execute_result = self._stringify_rows(kwargs["execute_result"])
+                    item.truncated = bool(kwargs.get("truncated"))
                 if kwargs.get("chart_option"):
                     item.chart_option = kwargs["chart_option"]
                 messages.append(item)
@@ -76,6 +81,7 @@ class ChatService:
                 sql = getattr(sql_result, "sql", None) or sql_result.get("sql")
 
             execute_result = self._stringify_rows(values.get("execute_result"))
+            truncated = bool(values.get("execute_truncated"))
             chart_option = values.get("chart_option")
 
             ec = values.get("error_code")
@@ -98,6 +104,7 @@ class ChatService:
             messages=messages,
             sql=sql,
             execute_result=execute_result,
+            truncated=truncated,
             chart_option=chart_option,
             error_code=error_code,
             error_message=error_message,
@@ -123,30 +130,94 @@ class ChatService:
         """
         conversation = await self._get_owned_conversation(conversation_id, user_id)
         config = self._build_config(conversation.thread_id)
+        input_data = await self._prepare_input(conversation, user_id, content)
+        return self._stream_graph(graph, conversation, config, input_data)
+
+    async def query(
+        self,
+        graph: CompiledStateGraph,
+        conversation_id: int,
+        user_id: int,
+        content: str,
+        columnar: bool = False,
+    ) -> SQLQueryResponse:
+        """非流式执行 SQL-only graph，返回 SQL 与结果集"""
+        conversation = await self._get_owned_conversation(conversation_id, user_id)
+        config = self._build_config(conversation.thread_id)
+        input_data = await self._prepare_input(conversation, user_id, content)
 
+        try:
+            await graph.ainvoke(input_data, config)
+        except Exception as e:
+            logger.exception("chat.query_error", conversation_id=conversation.id, error=str(e))
+            await self.repo.update_status(conversation.id, ConversationStatus.FAILED)
+            return SQLQueryResponse(status=ConversationStatus.FAILED, error_message=str(e))
+
+        state = await graph.aget_state(config)
+        values = state.values
+        if state.next:
+            await self.repo.update_status(conversation.id, ConversationStatus.WAITING_FOLLOW_UP)
+            return SQLQueryResponse(
+                status=ConversationStatus.WAITING_FOLLOW_UP,
+                follow_up_question=self._follow_up_question(values),
+            )
+
+        if not values.get("is_success"):
+            await self.repo.update_status(conversation.id, ConversationStatus.FAILED)
+            ec = values.get("error_code")
+            return SQLQueryResponse(
+                status=ConversationStatus.FAILED,
+                error_code=ec.value if ec else None,
+                error_message=values.get("error_message"),
+            )
+
+        await self.repo.update_status(conversation.id, ConversationStatus.COMPLETED)
+        msgs = values.get("messages", [])
+        if msgs and not self._is_query_intent(values):
+            # 非查询意图：本轮没有执行 SQL，只有直接回复
+            return SQLQueryResponse(status=ConversationStatus.COMPLETED, reply=msgs[-1].content)
+
+        rows = values.get("execute_result") or []
+        # 列名取自游标元数据，结果为空时同样可用；旧检查点中没有该字段时退回首行的键
+        columns = values.get("execute_columns") or (list(rows[0].keys()) if rows else [])
+        response = SQLQueryResponse(
+            status=ConversationStatus.COMPLETED,
+            sql=self._extract_sql(values),
+            columns=columns,
+            truncated=bool(values.get("execute_truncated")),
+        )
+        if columnar:
+            response.column_values = [[row.get(col) for row in rows] for col in columns]
+        else:
+            response.rows = rows
+        return response
+
+    async def _prepare_input(self, conversation: Conversation, user_id: int, content: str) -> Any:
+        """等待追问回复时构建 resume 指令，否则重置本轮状态并构建新输入"""
         if not conversation.title:
             await self.repo.update_title(conversation.id, content[:100])
 
         if conversation.status == ConversationStatus.WAITING_FOLLOW_UP:
-            input_data: Any = Command(resume=content)
-        else:
-            await self.repo.update_status(conversation.id, ConversationStatus.ACTIVE)
-            input_data = {
-                "messages": [HumanMessage(content=content)],
-                "user_id": str(user_id),
-                "retry_count": 0,
-                "schema_retry_count": 0,
-                "follow_up_count": 0,
-                "is_success": None,
-                "error_code": None,
-                "error_message": None,
-            }
+            return Command(resume=content)
 
-        return self._stream_graph(graph, conversation, config, input_data)
+        await self.repo.update_status(conversation.id, ConversationStatus.ACTIVE)
+        return {
+            "messages": [HumanMessage(content=content)],
+            "user_id": str(user_id),
+            "retry_count": 0,
+            "schema_retry_count": 0,
+            "missing_identifiers": [],
+            "follow_up_count": 0,
+            "is_success": None,
+            "error_code": None,
+            "error_message": None,
+        }
 
 
 
     _INTERNAL_NODES = {"__start__", "__end__"}
+    _STREAM_MODES = ["debug", "messages"]
+    _SUMMARY_NODES = {RESULT_SUMMARIZER}
 
     async def _stream_graph(
         self,
@@ -155,11 +226,26 @@ class ChatService:
         config: dict,
         input_data: Any,
     ) -> AsyncGenerator[str, None]:
-        """执行 graph 并以 SSE 事件流形式逐步返回节点执行进度与最终结果"""
+        """执行 graph 并以 SSE 事件流形式逐步返回节点执行进度、总结 token 与最终结果
+
+        总结 token 按 LLM 调用的消息 id 区分，重试换了调用时先发送 summary_reset
+        """
+        summary_message_id = None
         try:
-            async for chunk in graph.astream(
-                input_data, config, stream_mode="debug"
+            async for mode, chunk in graph.astream(
+                input_data, config, stream_mode=self._STREAM_MODES
             ):
+                if mode == "messages":
+                    delta = self._summary_delta(chunk)
+                    if delta:
+                        message_id = chunk[0].id
+                        if summary_message_id is not None and message_id != summary_message_id:
+                            # 总结 LLM 失败重试是一次新的调用，通知客户端丢弃已显示的部分 token
+                            yield self._sse_event("summary_reset", {})
+                        summary_message_id = message_id
+                        yield self._sse_event("summary_delta", {"delta": delta})
+                    continue
+
                 chunk_type = chunk.get("type")
                 payload = chunk.get("payload", {})
                 node_name = payload.get("name", "")
@@ -179,14 +265,7 @@ class ChatService:
                 await self.repo.update_status(
                     conversation.id, ConversationStatus.WAITING_FOLLOW_UP
                 )
-                ipr = state.values.get("intent_parse_result")
-                question = ""
-                if ipr:
-                    question = (
-                        getattr(ipr, "follow_up_question", None)
-                        or ipr.get("follow_up_question", "")
-                        or ""
-                    )
+                question = self._follow_up_question(state.values)
                 yield self._sse_event("follow_up", {"question": question})
             else:
                 values = state.values
@@ -194,12 +273,7 @@ class ChatService:
                     await self.repo.update_status(
                         conversation.id, ConversationStatus.COMPLETED
                     )
-                    sql_result = values.get("sql_result")
-                    sql = None
-                    if sql_result:
-                        sql = getattr(sql_result, "sql", None) or sql_result.get(
-                            "sql"
-                        )
+                    sql = self._extract_sql(values)
                     msgs = values.get("messages", [])
                     summary = ""
                     last_kwargs: dict = {}
@@ -215,6 +289,7 @@ class ChatService:
                             "sql": sql,
                             "summary": summary,
                             "execute_result": self._stringify_rows(last_kwargs.get("execute_result")),
+                            "truncated": bool(last_kwargs.get("truncated")),
                             "chart_option": last_kwargs.get("chart_option"),
                         },
                     )
@@ -233,6 +308,10 @@ class ChatService:
 
             yield self._sse_event("done", {})
 
+        except asyncio.CancelledError:
+            # 客户端断开 SSE 连接：取消向下传播到 graph 节点，由 BusinessDatabase 取消服务端查询
+            logger.info("chat.stream_cancelled", conversation_id=conversation.id)
+            raise
         except Exception as e:
             logger.exception(
                 "chat.stream_error",
@@ -256,6 +335,29 @@ class ChatService:
             raise ConversationAccessDeniedError()
         return conversation
 
+    @staticmethod
+    def _follow_up_question(values: Dict[str, Any]) -> str:
+        ipr = values.get("intent_parse_result")
+        if not ipr:
+            return ""
+        return getattr(ipr, "follow_up_question", None) or ipr.get("follow_up_question", "") or ""
+
+    @staticmethod
+    def _is_query_intent(values: Dict[str, Any]) -> bool:
+        ipr = values.get("intent_parse_result")
+        if not ipr:
+            return True
+        if isinstance(ipr, dict):
+            return bool(ipr.get("is_query_intent", True))
+        return ipr.is_query_intent
+
+    @staticmethod
+    def _extract_sql(values: Dict[str, Any]) -> str | None:
+        sql_result = values.get("sql_result")
+        if not sql_result:
+            return None
+        return getattr(sql_result, "sql", None) or sql_result.get("sql")
+
     @staticmethod
     def _build_config(thread_id: str) -> dict:
         return {
@@ -263,6 +365,15 @@ class ChatService:
             "recursion_limit": settings.AGENT_RECURSION_LIMIT,
         }
 
+    @classmethod
+    def _summary_delta(cls, chunk: tuple) -> str:
+        """messages 流模式下提取结果总结节点产生的 token，其余节点的 LLM 输出不外发"""
+        message, metadata = chunk
+        if metadata.get("langgraph_node") not in cls._SUMMARY_NODES:
+            return ""
+        content = message.content
+        return content if isinstance(content, str) else ""
+
     @staticmethod
     def _sse_event(event: str, data: Dict[str, Any]) -> str:
         payload = json.dumps(data, ensure_ascii=False, default=str)
@@ -5,32 +5,48 @@ from langchain_classic.indexes import SQLRecordManager
 from langchain_core.documents import Document
 from langchain_core.indexing.api import index as langchain_index
 
-from app.core.database import business_db
+from app.core.cache import invalidate_schema_caches, schema_fingerprint
+from app.core.catalog import schema_catalog
+from app.core.config import VectorStoreBackend, settings
+from app.core.database import TableMeta, business_db
 from app.core.logger import logger
 from app.core.vector_store import vector_store_manager
 
 
 class SchemaService:
-    """从业务数据库读取表结构并同步到 Milvus 向量库"""
+    """从业务数据库读取表结构并同步到向量库"""
     _SOURCE_ID_KEY = "table"
     _RECORD_MANAGER_DB = "sqlite:///./schema_record_manager.db"
     _RECORD_MANAGER_NAMESPACE = "schema_sync"
 
     def __init__(self) -> None:
         self._record_manager = SQLRecordManager(
-            namespace=self._RECORD_MANAGER_NAMESPACE,
+            namespace=self._record_manager_namespace(),
             db_url=self._RECORD_MANAGER_DB,
         )
         self._record_manager.create_schema()
 
+    @classmethod
+    def _record_manager_namespace(cls) -> str:
+        """各后端使用独立的同步记录，切换后端后首次同步会全量写入新后端"""
+        if settings.VECTOR_STORE_BACKEND == VectorStoreBackend.MILVUS:
+            return cls._RECORD_MANAGER_NAMESPACE
+        return f"{cls._RECORD_MANAGER_NAMESPACE}:{settings.VECTOR_STORE_BACKEND.value}"
+
     async def sync(self) -> int:
-        """读取业务库表结构，增量同步到 Milvus，返回同步的表数量"""
-        docs = await self._read_schemas()
+        """读取业务库表结构，刷新本地目录并增量同步到向量库，返回同步的表数量"""
+        metas = await business_db.get_table_metas()
+        schema_catalog.load(metas)
+        docs = self._to_documents(metas)
         if not docs:
             logger.warning("schema_sync.no_tables")
             return 0
 
         vector_store = vector_store_manager.vector_store
+        if getattr(vector_store, "needs_reindex", False):
+            # 本地索引缺失或不完整：清空同步记录，否则未变化的表会被跳过而不写入索引
+            await asyncio.to_thread(self._reset_record_manager)
+            vector_store.needs_reindex = False
         result = await asyncio.to_thread(
             langchain_index,
             docs,
@@ -48,29 +64,39 @@ class SchemaService:
             num_deleted=result.get("num_deleted", 0),
             num_skipped=result.get("num_skipped", 0),
         )
+        await self._refresh_fingerprint(docs)
         return result.get("num_added", 0) + result.get("num_updated", 0)
 
-    async def _read_schemas(self) -> list[Document]:
-        """通过 SQLAlchemy metadata 反射读取所有表的 DDL，每张表一个 Document"""
-        ddls = await business_db.get_table_ddls()
+    def _reset_record_manager(self) -> None:
+        keys = self._record_manager.list_keys()
+        if keys:
+            logger.warning("schema_sync.record_manager_reset", num_keys=len(keys))
+            self._record_manager.delete_keys(keys)
+
+    @staticmethod
+    async def _refresh_fingerprint(docs: list[Document]) -> None:
+        """按本次同步的 DDL 更新 schema 指纹，有变化时清理依赖 schema 的缓存"""
+        fingerprint = schema_fingerprint.compute(doc.page_content for doc in docs)
+        if await schema_fingerprint.update(fingerprint):
+            logger.info("schema_sync.fingerprint_changed", fingerprint=fingerprint)
+            await invalidate_schema_caches()
+
+    def _to_documents(self, metas: list[TableMeta]) -> list[Document]:
+        """将反射得到的表元数据转为 Document，每张表一个"""
         return [
             Document(
-                page_content=ddl.strip(),
-                metadata={self._SOURCE_ID_KEY: table_name},
+                page_content=meta.ddl.strip(),
+                metadata={self._SOURCE_ID_KEY: meta.name},
             )
-            for table_name, ddl in ddls
-            if ddl and ddl.strip()
+            for meta in metas
+            if meta.ddl and meta.ddl.strip()
         ]
 
     @staticmethod
     async def has_schemas() -> bool:
-        """检查 Milvus collection 中是否已有数据"""
+        """检查向量库中是否已有数据"""
         try:
-            vs = vector_store_manager.vector_store
-            col = vs.col
-            if col is None:
-                return False
-            return col.num_entities > 0
+            return await asyncio.to_thread(vector_store_manager.count) > 0
         except Exception as e:
-            logger.info("SchemaService.has_schemas:milvus has no schemas", e)
+            logger.info("SchemaService.has_schemas:vector store has no schemas", e)
             return False
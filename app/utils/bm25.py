@@ -0,0 +1,66 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+
+_TOKEN_PATTERN = re.compile(r"[A-Za-z0-9_]+|[一-鿿]+")
+_CAMEL_PATTERN = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """面向表名、列名与中文注释的分词：标识符保留整体并按下划线、驼峰拆分，中文按相邻二字切分"""
+    tokens: List[str] = []
+    for match in _TOKEN_PATTERN.finditer(text):
+        word = match.group()
+        if word[0] >= "一":
+            if len(word) == 1:
+                tokens.append(word)
+            else:
+                tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+            continue
+        tokens.append(word.lower())
+        parts = [p.lower() for piece in word.split("_") for p in _CAMEL_PATTERN.findall(piece)]
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 倒排索引，文档为已分词的 token 列表"""
+
+    def __init__(self, documents: Sequence[Sequence[str]], k1: float = 1.5, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self._doc_lengths = [len(doc) for doc in documents]
+        self._avg_length = sum(self._doc_lengths) / len(documents) if documents else 0.0
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+        for doc_id, doc in enumerate(documents):
+            for token, freq in Counter(doc).items():
+                self._postings.setdefault(token, []).append((doc_id, freq))
+        total = len(documents)
+        self._idf = {
+            token: math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for token, postings in self._postings.items()
+        }
+
+    def search(self, query_tokens: Sequence[str], k: int) -> List[Tuple[int, float]]:
+        """返回得分最高的 k 个 (文档下标, 得分)，不含零分文档"""
+        scores: Dict[int, float] = {}
+        for token in set(query_tokens):
+            postings = self._postings.get(token)
+            if not postings:
+                continue
+            idf = self._idf[token]
+            for doc_id, freq in postings:
+                norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / self._avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * freq * (self.k1 + 1) / (freq + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60) -> List[str]:
+    """倒数排名融合：每个列表贡献 1 / (k + 名次)，得分相同时保持先出现的顺序"""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda item: scores[item], reverse=True)
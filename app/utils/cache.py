@@ -1,6 +1,7 @@
 import asyncio
 import hashlib
 import json
+import sys
 import time
 from collections import OrderedDict
 from collections.abc import Awaitable, Coroutine
@@ -51,15 +52,42 @@ class CachedFunction:
         )
 
 
+def estimate_size(value: Any) -> int:
+    """Rough in-memory size of a cached value in bytes, used for byte-bounded LRU eviction."""
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, (int, float, bool)) or value is None:
+        return 8
+    if isinstance(value, dict):
+        return sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
 class LRUCache:
-    """Thread-safe LRU cache with TTL support. Used as L1 cache."""
+    """Thread-safe LRU cache with TTL support. Used as L1 cache.
 
-    def __init__(self, maxsize: int = 1000, default_ttl: int = 300) -> None:
+    Bounded by entry count, and additionally by total estimated bytes when max_bytes > 0.
+    """
+
+    def __init__(self, maxsize: int = 1000, default_ttl: int = 300, max_bytes: int = 0) -> None:
         self.maxsize = maxsize
         self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
         self._cache: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._bytes = 0
         self._lock = asyncio.Lock()
 
+    @property
+    def current_bytes(self) -> int:
+        return self._bytes
+
+    def _remove(self, key: str) -> None:
+        del self._cache[key]
+        self._bytes -= self._sizes.pop(key, 0)
+
     async def get(self, key: str) -> Optional[Any]:
         async with self._lock:
             if key not in self._cache:
@@ -68,7 +96,7 @@ class LRUCache:
             value, expires_at = self._cache[key]
 
             if expires_at and time.time() > expires_at:
-                del self._cache[key]
+                self._remove(key)
                 return None
 
             self._cache.move_to_end(key)
@@ -85,24 +113,35 @@ class LRUCache:
                 ttl = self.default_ttl
 
             expires_at = time.time() + ttl if ttl > 0 else 0
-
+            size = estimate_size(value) if self.max_bytes > 0 else 0
+            # 先移除旧值：新值超出上限不缓存时，也不能继续返回已过时的旧值
             if key in self._cache:
-                self._cache.move_to_end(key)
-            elif len(self._cache) >= self.maxsize:
-                self._cache.popitem(last=False)
+                self._remove(key)
+            if self.max_bytes > 0 and size > self.max_bytes:
+                return
+
+            while self._cache and (
+                len(self._cache) >= self.maxsize
+                or (self.max_bytes > 0 and self._bytes + size > self.max_bytes)
+            ):
+                self._remove(next(iter(self._cache)))
 
             self._cache[key] = (value, expires_at)
+            self._sizes[key] = size
+            self._bytes += size
 
     async def delete(self, key: str) -> bool:
         async with self._lock:
             if key in self._cache:
-                del self._cache[key]
+                self._remove(key)
                 return True
             return False
 
     async def clear(self) -> None:
         async with self._lock:
             self._cache.clear()
+            self._sizes.clear()
+            self._bytes = 0
 
     async def cleanup_expired(self) -> int:
         async with self._lock:
@@ -112,7 +151,7 @@ class LRUCache:
                 if expires_at and now > expires_at
             ]
             for key in expired_keys:
-                del self._cache[key]
+                self._remove(key)
             return len(expired_keys)
 
 
@@ -125,6 +164,7 @@ class MultiLevelCache:
         self,
         redis=None,
         l1_maxsize: int = 1000,
+        l1_max_bytes: int = 0,
         l1_ttl: int = 60,
         l2_ttl: int = 300,
         key_prefix: str = "cache",
@@ -132,7 +172,7 @@ class MultiLevelCache:
         lock_timeout: int = 5,
     ) -> None:
         self.redis = redis
-        self.l1 = LRUCache(maxsize=l1_maxsize, default_ttl=l1_ttl)
+        self.l1 = LRUCache(maxsize=l1_maxsize, default_ttl=l1_ttl, max_bytes=l1_max_bytes)
         self.l1_ttl = l1_ttl
         self.l2_ttl = l2_ttl
         self.key_prefix = key_prefix
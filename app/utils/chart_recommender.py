@@ -0,0 +1,208 @@
+import re
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from app.schemas.agent import ChartAdvice, ChartType
+
+# 列名按下划线与驼峰拆成单词后整词匹配，避免 update_by 之类命中 date；created_at 等以 _at 结尾的列也视为时间
+_TIME_COLUMN_WORDS = frozenset({
+    "date", "datetime", "time", "timestamp", "dt", "hour", "day", "week", "month", "quarter", "year", "period",
+})
+_TIME_COLUMN_SUFFIX = "at"
+_COLUMN_WORD_PATTERN = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+")
+# 中文列名包含完整时间词或以年/月/日/周结尾，避免 年龄段 之类命中 年
+_TIME_COLUMN_CN_PATTERN = re.compile(r"日期|时间|年份|月份|季度|[年月日周]$")
+# 年开头的日期/时间/期间文本：2024-01-05、2024/1、2024年3月、2024Q1、2024-W05、2024-01-05 10:00:00
+_DATE_STRING_PATTERN = re.compile(r"^\d{4}(?:[-/.年]\d{1,2}|[-\s]?[Qq][1-4]|-?W\d{1,2}|年)")
+_TITLE_MAX_LENGTH = 30
+_SCATTER_MIN_ROWS = 3
+
+# 各结果形态下与规则推荐兼容的用户偏好，偏好不兼容时交由 LLM 判断
+_TEMPORAL_CHART_TYPES = {ChartType.LINE, ChartType.AREA, ChartType.BAR}
+_CATEGORICAL_CHART_TYPES = {ChartType.BAR, ChartType.HORIZONTAL_BAR, ChartType.PIE, ChartType.FUNNEL}
+# 规则推荐中对结果形态有要求的图表类型
+_SINGLE_DIMENSION_CHART_TYPES = {ChartType.PIE, ChartType.FUNNEL}
+_TIME_SERIES_CHART_TYPES = {ChartType.LINE, ChartType.AREA}
+
+
+def recommend(
+    rows: List[Dict[str, Any]],
+    title: str = "",
+    preference: Optional[ChartType] = None,
+) -> Optional[ChartAdvice]:
+    """按列类型规则推荐图表，不调用 LLM：时间维度用折线图，其余维度用柱状图，
+    两个数值列且无维度时用散点图；用户偏好与结果形态不符时忽略偏好；没有可用的数值列时返回 None
+    """
+    if not rows:
+        return None
+
+    first_row = rows[0]
+    numeric, dimensions = _split_columns(first_row)
+    if not numeric:
+        return None
+
+    title = title[:_TITLE_MAX_LENGTH]
+    if not dimensions:
+        if len(numeric) < 2:
+            return None
+        return ChartAdvice(chart_type=ChartType.SCATTER, title=title, x_field=numeric[0], y_field=numeric[1])
+
+    if preference == ChartType.NONE or (preference and not fits_preference(rows, preference)):
+        preference = None
+    if preference == ChartType.SCATTER:
+        return ChartAdvice(chart_type=ChartType.SCATTER, title=title, x_field=numeric[0], y_field=numeric[1])
+
+    x_field = dimensions[0]
+    series_field = dimensions[1] if len(dimensions) > 1 else None
+    if preference:
+        chart_type = preference
+    elif _is_time_dimension(x_field, first_row[x_field]):
+        chart_type = ChartType.LINE
+    else:
+        chart_type = ChartType.BAR
+
+    return ChartAdvice(
+        chart_type=chart_type,
+        title=title,
+        x_field=x_field,
+        y_field=numeric[0],
+        series_field=series_field,
+    )
+
+
+def fits_preference(rows: List[Dict[str, Any]], preference: ChartType) -> bool:
+    """用户指定的图表类型是否适用于结果形态：散点图需要至少两个数值列，饼图、漏斗图需要单一维度且无系列，
+    折线图、面积图需要时间维度，其余类型需要一个维度
+    """
+    if not rows or preference == ChartType.NONE:
+        return False
+    first_row = rows[0]
+    numeric, dimensions = _split_columns(first_row)
+    if not numeric:
+        return False
+    if preference == ChartType.SCATTER:
+        return len(numeric) >= 2
+    if preference in _SINGLE_DIMENSION_CHART_TYPES:
+        return len(dimensions) == 1
+    if preference in _TIME_SERIES_CHART_TYPES:
+        return bool(dimensions) and _is_time_dimension(dimensions[0], first_row[dimensions[0]])
+    return bool(dimensions)
+
+
+def _split_columns(row: Dict[str, Any]) -> tuple[list[str], list[str]]:
+    """按首行取值将列划分为数值列与维度列"""
+    numeric = [c for c, v in row.items() if _is_numeric(v)]
+    return numeric, [c for c in row if c not in numeric]
+
+
+def _is_numeric(value: Any) -> bool:
+    return isinstance(value, (int, float, Decimal)) and not isinstance(value, bool)
+
+
+def _is_time_dimension(column: str, value: Any) -> bool:
+    return _is_date_value(value) or _is_time_column(column)
+
+
+def _is_time_column(column: str) -> bool:
+    """列名是否表示时间：英文按整词匹配，中文按完整时间词或结尾字匹配"""
+    words = [w.lower() for w in _COLUMN_WORD_PATTERN.findall(column)]
+    if any(w in _TIME_COLUMN_WORDS for w in words) or (len(words) > 1 and words[-1] == _TIME_COLUMN_SUFFIX):
+        return True
+    return bool(_TIME_COLUMN_CN_PATTERN.search(column))
+
+
+def _is_date_value(value: Any) -> bool:
+    """date/datetime 或以年份开头的日期、期间文本"""
+    if isinstance(value, (date, datetime)):
+        return True
+    return isinstance(value, str) and bool(_DATE_STRING_PATTERN.match(value.strip()))
+
+
+def recommend_confident(
+    rows: List[Dict[str, Any]],
+    title: str = "",
+    preference: Optional[ChartType] = None,
+    max_categories: int = 20,
+) -> Optional[ChartAdvice]:
+    """扫描完整结果集的列类型与基数，仅在形态明确时返回图表建议，形态模糊时返回 None 交由 LLM 判断
+
+    - 一个时间维度（可选一个低基数系列维度）+ 数值列，且每个 (x, 系列) 唯一 → 折线图
+    - 一个低基数类别维度 + 一个数值列，且类别唯一 → 柱状图（用户偏好饼图等时沿用偏好）
+    - 无维度、恰好两个数值列 → 散点图
+    """
+    if not rows:
+        return None
+
+    numeric, temporal, categorical = _classify_columns(rows)
+    if not numeric:
+        return None
+    if preference == ChartType.NONE:
+        preference = None
+    title = title[:_TITLE_MAX_LENGTH]
+
+    if not temporal and not categorical:
+        if len(numeric) != 2 or len(rows) < _SCATTER_MIN_ROWS:
+            return None
+        if preference and preference != ChartType.SCATTER:
+            return None
+        return ChartAdvice(chart_type=ChartType.SCATTER, title=title, x_field=numeric[0], y_field=numeric[1])
+
+    if len(temporal) == 1 and len(categorical) <= 1:
+        x_field = temporal[0]
+        series_field = categorical[0] if categorical else None
+        if series_field and _cardinality(rows, series_field) > max_categories:
+            return None
+        if not _is_unique(rows, x_field, series_field):
+            return None
+        chart_type = preference or ChartType.LINE
+        if chart_type not in _TEMPORAL_CHART_TYPES:
+            return None
+        return ChartAdvice(
+            chart_type=chart_type,
+            title=title,
+            x_field=x_field,
+            y_field=numeric[0],
+            series_field=series_field,
+        )
+
+    if not temporal and len(categorical) == 1 and len(numeric) == 1:
+        x_field = categorical[0]
+        if len(rows) > max_categories or not _is_unique(rows, x_field):
+            return None
+        chart_type = preference or ChartType.BAR
+        if chart_type not in _CATEGORICAL_CHART_TYPES:
+            return None
+        return ChartAdvice(chart_type=chart_type, title=title, x_field=x_field, y_field=numeric[0])
+
+    return None
+
+
+def _classify_columns(rows: List[Dict[str, Any]]) -> tuple[list[str], list[str], list[str]]:
+    """按全部行的非空值将列划分为数值列、时间维度、类别维度；全为空的列不参与推荐"""
+    numeric: list[str] = []
+    temporal: list[str] = []
+    categorical: list[str] = []
+    for column in rows[0]:
+        values = [row.get(column) for row in rows if row.get(column) is not None]
+        if not values:
+            continue
+        if all(_is_numeric(v) for v in values):
+            numeric.append(column)
+        elif all(_is_date_value(v) for v in values) or (
+            all(isinstance(v, str) for v in values) and _is_time_column(column)
+        ):
+            temporal.append(column)
+        else:
+            categorical.append(column)
+    return numeric, temporal, categorical
+
+
+def _cardinality(rows: List[Dict[str, Any]], column: str) -> int:
+    return len({row.get(column) for row in rows})
+
+
+def _is_unique(rows: List[Dict[str, Any]], column: str, series: Optional[str] = None) -> bool:
+    """维度（及系列）组合在结果中是否唯一，不唯一说明结果未按维度聚合"""
+    keys = {(row.get(column), row.get(series) if series else None) for row in rows}
+    return len(keys) == len(rows)
@@ -0,0 +1,90 @@
+import re
+
+import xxhash
+from sqlglot import exp
+from sqlglot.optimizer.canonicalize import canonicalize as canonicalize_rule
+from sqlglot.optimizer.normalize import normalize
+from sqlglot.optimizer.qualify import qualify
+from sqlglot.optimizer.simplify import simplify
+
+from app.core.logger import logger
+from app.utils.sql_parser import parse_sql
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def canonicalize(sql: str, dialect: str) -> str:
+    """将 SQL 归一化为规范形式：限定列引用、统一表别名、去掉输出列别名、
+    规范化谓词顺序，仅空白、别名或谓词顺序不同的 SQL 得到相同结果
+
+    规范形式只用于判等，不保证可执行；解析或优化失败时退化为压缩空白后的小写文本
+    """
+    try:
+        tree = parse_sql(sql, dialect)
+        tree = qualify(
+            tree,
+            dialect=dialect,
+            validate_qualify_columns=False,
+            quote_identifiers=False,
+            identify=False,
+        )
+        _rename_table_aliases(tree)
+        _strip_projection_aliases(tree)
+        tree = normalize(tree)
+        tree = simplify(tree, dialect=dialect)
+        tree = canonicalize_rule(tree, dialect=dialect)
+        return tree.sql(dialect=dialect)
+    except Exception as e:
+        logger.debug("sql_canonical.optimize_failed", error=str(e))
+        return _WHITESPACE_PATTERN.sub(" ", sql.strip().rstrip(";")).lower()
+
+
+def canonical_hash(sql: str, dialect: str) -> str:
+    """规范形式的 xxhash 摘要，用于候选去重"""
+    return xxhash.xxh3_64_hexdigest(canonicalize(sql, dialect).encode())
+
+
+def _rename_table_aliases(tree: exp.Expression) -> None:
+    """按出现顺序将表别名统一重命名为 <表名>_<序号>，并同步改写列引用"""
+    aliases: dict[str, str] = {}
+    for table in tree.find_all(exp.Table):
+        alias = table.alias
+        if not alias or alias in aliases:
+            continue
+        aliases[alias] = f"{table.name}_{len(aliases)}"
+        table.set("alias", exp.TableAlias(this=exp.to_identifier(aliases[alias])))
+
+    for column in tree.find_all(exp.Column):
+        if column.table in aliases:
+            column.set("table", exp.to_identifier(aliases[column.table]))
+
+
+def _strip_projection_aliases(tree: exp.Expression) -> None:
+    """去掉最外层 SELECT（顶层 UNION 的每个分支）的输出列别名，ORDER BY 中引用别名的列替换为对应表达式
+
+    CTE 与子查询内部的别名会被外层引用，改变它们会改变语义，保持不动
+    """
+    for select in _outer_selects(tree):
+        projections = {
+            e.alias: e.this for e in select.expressions if isinstance(e, exp.Alias)
+        }
+        order = select.args.get("order")
+        if order and projections:
+            for column in list(order.find_all(exp.Column)):
+                if not column.table and column.name in projections:
+                    column.replace(projections[column.name].copy())
+        select.set(
+            "expressions",
+            [e.this if isinstance(e, exp.Alias) else e for e in select.expressions],
+        )
+
+
+def _outer_selects(node: exp.Expression) -> list[exp.Select]:
+    """决定结果列的 SELECT：查询本身，或顶层集合运算的各个分支"""
+    if isinstance(node, exp.Subquery):
+        return _outer_selects(node.this)
+    if isinstance(node, exp.SetOperation):
+        return _outer_selects(node.left) + _outer_selects(node.right)
+    if isinstance(node, exp.Select):
+        return [node]
+    return []
@@ -0,0 +1,31 @@
+import asyncio
+from functools import lru_cache
+
+import sqlglot
+from sqlglot import exp
+
+from app.core.config import settings
+
+
+@lru_cache(maxsize=settings.SQL_PARSE_CACHE_SIZE)
+def _parse_cached(sql: str, dialect: str) -> exp.Expression:
+    return sqlglot.parse_one(sql, dialect=dialect)
+
+
+def parse_sql(sql: str, dialect: str, copy: bool = True) -> exp.Expression:
+    """按 (sql, dialect) 缓存解析结果；缓存中的 AST 为进程内共享，
+    需要修改时必须 copy=True 取副本，只读遍历可传 copy=False 省去复制开销
+
+    Raises:
+        sqlglot.errors.ParseError: SQL 无法解析
+    """
+    tree = _parse_cached(sql, dialect)
+    return tree.copy() if copy else tree
+
+
+async def aparse_sql(sql: str, dialect: str, copy: bool = True) -> exp.Expression:
+    """parse_sql 的异步版本，超长 SQL 放到线程中解析，避免阻塞事件循环"""
+    threshold = settings.SQL_PARSE_THREAD_THRESHOLD
+    if threshold > 0 and len(sql) >= threshold:
+        return await asyncio.to_thread(parse_sql, sql, dialect, copy)
+    return parse_sql(sql, dialect, copy)
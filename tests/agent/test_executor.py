@@ -0,0 +1,64 @@
+import pytest
+
+from app.agent.nodes.executor import Executor
+from app.agent.nodes.sql_selector import SQLSelector
+from app.agent.states import NL2SQLState
+from app.core.cache import candidate_result_cache
+from app.core.config import settings
+from app.core.database import business_db
+from app.core.dialect import ExplainAnalysis, detect_dialect
+from app.schemas.agent import SQLResult, ValidatedCandidate
+
+_COLUMNS = ["id", "amount"]
+_ROWS = [{"id": i, "amount": i * 10} for i in range(120)]
+
+
+@pytest.fixture(autouse=True)
+def reuse_execution(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(business_db, "_dialect", detect_dialect("mysql+aiomysql://localhost/test"))
+    monkeypatch.setattr(settings, "SQL_SELECTOR_REUSE_EXECUTION", True)
+
+
+def _candidate(sql: str) -> ValidatedCandidate:
+    return ValidatedCandidate(sql=sql, explain=ExplainAnalysis(cost=1))
+
+
+async def test_selector_keeps_full_result_out_of_state() -> None:
+    """完整结果只存进程内缓存，状态中仅保留样本与缓存键，不随检查点持久化"""
+    entry = await SQLSelector._build_exec_result(_candidate("SELECT id, amount FROM t"), _ROWS, _COLUMNS)
+    assert entry.result_key is not None
+    assert len(entry.exec_result) == SQLSelector._COMPARE_LIMIT
+    assert "full_result" not in entry.model_dump()
+    assert await candidate_result_cache.get(entry.result_key) == (_COLUMNS, _ROWS)
+
+
+async def test_executor_reuses_winner_and_clears_all_candidates() -> None:
+    winner = await SQLSelector._build_exec_result(_candidate("SELECT id, amount FROM t"), _ROWS, _COLUMNS)
+    loser = await SQLSelector._build_exec_result(_candidate("SELECT amount, id FROM t"), _ROWS[:1], ["amount", "id"])
+    state = NL2SQLState(
+        sql_result=SQLResult(sql=winner.sql),
+        candidate_exec_results=[winner, loser],
+    )
+
+    result = await Executor()(state)
+
+    assert result["execute_result"] == _ROWS
+    assert result["execute_columns"] == _COLUMNS
+    assert await candidate_result_cache.get(winner.result_key) is None
+    assert await candidate_result_cache.get(loser.result_key) is None
+
+
+async def test_executor_takes_columns_from_cursor_on_empty_result(monkeypatch: pytest.MonkeyPatch) -> None:
+    """空结果集没有首行可取键，列名来自游标元数据"""
+    async def stream_query(sql, batch_size, timeout, columns):
+        columns[:] = _COLUMNS
+        return
+        yield
+
+    executor = Executor()
+    monkeypatch.setattr(executor.db, "stream_query", stream_query)
+
+    result = await executor(NL2SQLState(sql_result=SQLResult(sql="SELECT id, amount FROM t WHERE 1 = 0")))
+
+    assert result["execute_result"] == []
+    assert result["execute_columns"] == _COLUMNS
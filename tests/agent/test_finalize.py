@@ -0,0 +1,31 @@
+from langchain_core.messages import AIMessage
+from langgraph.graph import END
+
+from app.agent.graph import FINALIZE, route_after_executor_sql_only
+from app.agent.nodes.finalize import Finalize
+from app.agent.states import NL2SQLState
+from app.schemas.agent import SQLResult
+
+_ROWS = [{"region": "华东", "gmv": 1}]
+
+
+def test_sql_only_routes_to_finalize_after_success() -> None:
+    assert route_after_executor_sql_only(NL2SQLState(is_success=True)) == FINALIZE
+    assert route_after_executor_sql_only(NL2SQLState(is_success=False)) == END
+
+
+async def test_sql_only_finalize_writes_sql_and_result() -> None:
+    """SQL-only profile 不读取上一轮残留的总结与图表"""
+    state = NL2SQLState(
+        sql_result=SQLResult(sql="SELECT region, gmv FROM t"),
+        execute_result=_ROWS,
+        summary="上一轮的总结",
+        chart_option={"series": []},
+    )
+
+    result = await Finalize(with_presentation=False)(state)
+
+    message = result["messages"][0]
+    assert isinstance(message, AIMessage)
+    assert message.content == f"```sql\nSELECT region, gmv FROM t\n```\n\n{Finalize._FALLBACK_SUMMARY}"
+    assert message.additional_kwargs == {"execute_result": _ROWS}
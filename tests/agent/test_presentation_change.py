@@ -0,0 +1,40 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from app.agent.nodes.presentation_change import PresentationChange
+from app.agent.states import NL2SQLState
+from app.schemas.agent import ChartType, IntentParseResult
+
+
+def _state(rows: list[dict], preference: ChartType) -> NL2SQLState:
+    return NL2SQLState(
+        messages=[
+            HumanMessage(content="各区域 GMV"),
+            AIMessage(content="```sql\nSELECT 1\n```\n\n查询完成。", additional_kwargs={"execute_result": rows}),
+            HumanMessage(content=f"换成{preference.value}"),
+        ],
+        intent_parse_result=IntentParseResult(is_presentation_change=True, chart_preference=preference),
+        execute_result=rows,
+    )
+
+
+@pytest.mark.parametrize(("rows", "preference"), [
+    ([{"region": "华东", "gmv": 1}], ChartType.SCATTER),
+    (
+        [
+            {"month": "2024-01", "region": "华东", "gmv": 1},
+            {"month": "2024-01", "region": "华北", "gmv": 2},
+        ],
+        ChartType.PIE,
+    ),
+])
+async def test_unfit_preference_falls_back(rows: list[dict], preference: ChartType) -> None:
+    """偏好与结果形态不符时不写入消息，由路由退回图表推荐与结果总结"""
+    assert await PresentationChange()(_state(rows, preference)) == {}
+
+
+async def test_fit_preference_rebuilds_chart() -> None:
+    rows = [{"region": "华东", "gmv": 1}, {"region": "华北", "gmv": 2}]
+    result = await PresentationChange()(_state(rows, ChartType.PIE))
+    assert result["chart_option"]
+    assert result["messages"][0].additional_kwargs["chart_option"] == result["chart_option"]
@@ -0,0 +1,115 @@
+import asyncio
+from collections.abc import AsyncIterator
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from app.agent.nodes.schema_retriever import SchemaPrefetch, SchemaRetriever
+from app.agent.states import NL2SQLState
+from app.core.cache import retrieval_cache, schema_fingerprint
+from app.core.catalog import schema_catalog
+from app.core.config import settings
+from app.core.database import TableMeta
+
+# 换话题后检索查询仍以历史消息为主，整体向量与上一轮接近；只有最新问题的向量明显不同
+_EMBEDDINGS = {
+    "上个月订单总额": [1.0, 0.0, 0.0],
+    "按地区拆分": [0.98, 0.2, 0.0],
+    "员工请假天数": [0.0, 0.0, 1.0],
+}
+
+
+class _FakeVectorStoreManager:
+    async def aembed_query(self, query: str) -> list[float]:
+        return _EMBEDDINGS.get(query, [1.0, 0.1, 0.1])
+
+
+@pytest.fixture
+async def retriever(monkeypatch: pytest.MonkeyPatch) -> AsyncIterator[SchemaRetriever]:
+    monkeypatch.setattr(settings, "SCHEMA_RETRIEVAL_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "SCHEMA_HYBRID_ENABLED", False)
+
+    async def fingerprint() -> str:
+        return "fp"
+
+    monkeypatch.setattr(schema_fingerprint, "get", fingerprint)
+    await retrieval_cache.clear()
+    retriever = SchemaRetriever()
+    retriever._vs_manager = _FakeVectorStoreManager()
+    retriever.searches = []
+
+    async def search_by_vector(embedding: list[float], fp: str) -> list[str]:
+        retriever.searches.append(embedding)
+        return [f"CREATE TABLE t{len(retriever.searches)} ()"]
+
+    monkeypatch.setattr(retriever, "_cached_search_by_vector", search_by_vector)
+    yield retriever
+    await retrieval_cache.clear()
+
+
+def _state(*questions: str) -> NL2SQLState:
+    return NL2SQLState(messages=[HumanMessage(content=q) for q in questions])
+
+
+async def _search(retriever: SchemaRetriever, state: NL2SQLState) -> list[str]:
+    query = retriever.build_retrieval_query(state)
+    return await retriever.search(query, "thread-1", retriever.latest_question(state))
+
+
+async def test_search_reuses_hits_for_similar_follow_up(retriever: SchemaRetriever) -> None:
+    first = await _search(retriever, _state("上个月订单总额"))
+    second = await _search(retriever, _state("上个月订单总额", "按地区拆分"))
+    assert second == first
+    assert len(retriever.searches) == 1
+
+
+async def test_search_runs_fresh_after_topic_shift(retriever: SchemaRetriever) -> None:
+    """最新问题换了话题，即使窗口内的历史消息相同也必须重新检索"""
+    await _search(retriever, _state("上个月订单总额", "按地区拆分"))
+    hits = await _search(retriever, _state("上个月订单总额", "按地区拆分", "员工请假天数"))
+    assert hits == ["CREATE TABLE t2 ()"]
+    assert len(retriever.searches) == 2
+
+
+def test_fuse_lexical_promotes_tables_hit_by_both(monkeypatch: pytest.MonkeyPatch) -> None:
+    """向量与 BM25 都命中的表排在前面，只被词法命中的表也能进入结果"""
+    monkeypatch.setattr(settings, "SCHEMA_HYBRID_ENABLED", True)
+    monkeypatch.setattr(settings, "MILVUS_SEARCH_LIMIT", 3)
+    snapshot = dict(vars(schema_catalog))
+    schema_catalog.load([
+        TableMeta(name="users", ddl="CREATE TABLE users ()", columns={"id": "INT", "name": "TEXT"}),
+        TableMeta(name="refunds", ddl="CREATE TABLE refunds ()", columns={"id": "INT", "refund_amount": "INT"}),
+        TableMeta(name="coupons", ddl="CREATE TABLE coupons ()", columns={"id": "INT", "code": "TEXT"}),
+    ])
+    try:
+        fused = SchemaRetriever._fuse_lexical(
+            "refund amount by users",
+            ["CREATE TABLE orders ()", "CREATE TABLE users ()", "CREATE TABLE coupons ()"],
+        )
+    finally:
+        vars(schema_catalog).update(snapshot)
+    assert fused == ["CREATE TABLE users ()", "CREATE TABLE orders ()", "CREATE TABLE refunds ()"]
+
+
+async def test_prefetch_runs_in_background_until_retriever_takes_it(
+    retriever: SchemaRetriever, monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """预取节点不等待检索完成，闲聊等路由不会被拖慢；schema_retriever 取用同一次检索的结果"""
+    released = asyncio.Event()
+    calls: list[list[float]] = []
+
+    async def slow_search(embedding: list[float], fp: str) -> list[str]:
+        calls.append(embedding)
+        await released.wait()
+        return ["CREATE TABLE orders ()"]
+
+    monkeypatch.setattr(retriever, "_cached_search_by_vector", slow_search)
+    state = _state("上个月订单总额")
+    config = {"configurable": {"thread_id": "thread-1"}}
+
+    assert await asyncio.wait_for(SchemaPrefetch(retriever)(state, config), timeout=1) == {}
+
+    released.set()
+    result = await retriever(state, config)
+    assert result["schemas"] == ["CREATE TABLE orders ()"]
+    assert len(calls) == 1
@@ -0,0 +1,115 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from langchain_openai import ChatOpenAI
+from langgraph.graph import END, START, StateGraph
+from typing_extensions import TypedDict
+
+from app.agent.nodes import sql_generator as sql_generator_module
+from app.agent.nodes.sql_generator import SQLGenerator
+from app.agent.states import NL2SQLState
+from app.core.config import settings
+from app.core.database import business_db
+from app.core.dialect import detect_dialect
+from app.schemas.agent import SQLResult
+from app.services.chat import ChatService
+
+_CHOICE_SQLS = [
+    "SELECT COUNT(*) FROM orders",
+    "SELECT SUM(amount) FROM orders",
+    "SELECT AVG(amount) FROM orders",
+]
+
+
+def _completion(body: dict) -> dict:
+    return {
+        "id": "chatcmpl-test",
+        "object": "chat.completion",
+        "created": 0,
+        "model": body["model"],
+        "choices": [
+            {
+                "index": i,
+                "finish_reason": "tool_calls",
+                "message": {
+                    "role": "assistant",
+                    "content": None,
+                    "tool_calls": [{
+                        "id": f"call_{i}",
+                        "type": "function",
+                        "function": {"name": "SQLResult", "arguments": json.dumps({"sql": sql})},
+                    }],
+                },
+            }
+            for i, sql in enumerate(_CHOICE_SQLS[:body.get("n", 1)])
+        ],
+        "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+    }
+
+
+def _handler(request: httpx.Request) -> httpx.Response:
+    body = json.loads(request.content)
+    if body.get("stream"):
+        return httpx.Response(400, json={"error": {"message": "stream not supported by fake server"}})
+    return httpx.Response(200, json=_completion(body))
+
+
+class _State(TypedDict, total=False):
+    count: int
+
+
+@pytest.fixture
+def generator(monkeypatch: pytest.MonkeyPatch) -> SQLGenerator:
+    monkeypatch.setattr(business_db, "_dialect", detect_dialect("mysql+aiomysql://localhost/test"))
+    fake_llm = ChatOpenAI(
+        model="test",
+        api_key="test",
+        max_retries=0,
+        http_async_client=httpx.AsyncClient(transport=httpx.MockTransport(_handler)),
+    )
+    monkeypatch.setattr(sql_generator_module, "llm", fake_llm)
+    return SQLGenerator()
+
+
+async def test_generate_choices_returns_distinct_candidates_under_sse_stream_modes(generator: SQLGenerator) -> None:
+    """SSE 使用 messages 流模式时，n 个 choice 仍需逐个返回，不能被合并为一次流式调用"""
+    results: list = []
+
+    async def node(state: _State) -> _State:
+        results.extend(await generator._generate_choices([], count=3, temperature=0.7))
+        return {"count": len(results)}
+
+    graph = StateGraph(_State)
+    graph.add_node("sql_generator", node)
+    graph.add_edge(START, "sql_generator")
+    graph.add_edge("sql_generator", END)
+
+    async for _ in graph.compile().astream({}, stream_mode=ChatService._STREAM_MODES):
+        pass
+
+    assert [r.sql for r in results] == _CHOICE_SQLS
+
+
+async def test_quorum_stop_skips_agreement_sample(generator: SQLGenerator, monkeypatch: pytest.MonkeyPatch) -> None:
+    """达到法定票数提前结束时，被取消的候选未参与比对，不能写入 candidate_pattern 作为一致率样本"""
+    monkeypatch.setattr(settings, "SQL_CANDIDATE_QUORUM", 2)
+    monkeypatch.setattr(settings, "SQL_CANDIDATE_MULTI_CHOICE", False)
+    delays = iter([0, 0, 10])
+
+    async def generate_single(prompt_messages, temperature):
+        await asyncio.sleep(next(delays))
+        return SQLResult(sql="SELECT COUNT(*) FROM orders")
+
+    async def choose(question, retry_count):
+        return 3, "k0:l0:c0"
+
+    monkeypatch.setattr(generator, "_generate_single", generate_single)
+    monkeypatch.setattr(generator, "_build_prompt", lambda state: [])
+    monkeypatch.setattr(sql_generator_module.candidate_policy, "choose", choose)
+
+    result = await generator(NL2SQLState())
+
+    assert len(result["sql_candidates"]) == 2
+    assert result["candidate_pattern"] is None
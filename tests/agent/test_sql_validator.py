@@ -0,0 +1,61 @@
+from collections.abc import Iterator
+
+import pytest
+
+from app.agent.nodes.sql_validator import SQLValidator
+from app.core.cache import schema_fingerprint
+from app.core.catalog import schema_catalog
+from app.core.database import TableMeta, business_db
+from app.core.dialect import detect_dialect
+from app.schemas.agent import SQLResult
+
+
+@pytest.fixture
+def validator(monkeypatch: pytest.MonkeyPatch) -> Iterator[SQLValidator]:
+    monkeypatch.setattr(business_db, "_dialect", detect_dialect("mysql+aiomysql://localhost/test"))
+    snapshot = dict(vars(schema_catalog))
+    schema_catalog.load([
+        TableMeta(name="orders", ddl="CREATE TABLE orders ()", columns={"id": "INT", "user_id": "INT"}),
+        TableMeta(name="users", ddl="CREATE TABLE users ()", columns={"id": "INT", "name": "TEXT"}),
+    ])
+    yield SQLValidator()
+    vars(schema_catalog).update(snapshot)
+
+
+def _check(validator: SQLValidator, sql: str):
+    return validator._check_catalog(sql, schema_fingerprint.UNKNOWN)
+
+
+def test_check_catalog_accepts_valid_sql(validator: SQLValidator) -> None:
+    assert _check(validator, "SELECT u.name FROM orders o JOIN users u ON o.user_id = u.id") is None
+
+
+def test_check_catalog_reports_missing_column(validator: SQLValidator) -> None:
+    error = _check(validator, "SELECT nope FROM orders")
+    assert error is not None
+    assert validator.dialect.extract_missing_identifiers(error) == ["nope"]
+
+
+def test_check_catalog_reports_unknown_table(validator: SQLValidator) -> None:
+    error = _check(validator, "SELECT id FROM payments")
+    assert validator.dialect.extract_missing_identifiers(error) == ["payments"]
+
+
+def test_check_catalog_reports_ambiguous_column_separately(validator: SQLValidator) -> None:
+    """两张表都有的未限定列是歧义，不能当作缺失标识符去补检"""
+    error = _check(validator, "SELECT id FROM orders o JOIN users u ON o.user_id = u.id")
+    assert error is not None and "Ambiguous column 'id'" in error
+    assert validator.dialect.extract_missing_identifiers(error) == []
+
+
+def test_dedup_candidates_merges_canonical_duplicates(validator: SQLValidator) -> None:
+    candidates = [
+        SQLResult(sql="SELECT o.id FROM orders o"),
+        SQLResult(sql="SELECT name FROM users"),
+        SQLResult(sql="select x.id from orders as x;"),
+    ]
+    deduped = validator._dedup_candidates(candidates)
+    assert [(c.sql, votes) for c, _, votes in deduped] == [
+        ("SELECT o.id FROM orders o", 2),
+        ("SELECT name FROM users", 1),
+    ]
@@ -0,0 +1,41 @@
+from collections.abc import Iterator
+
+import pytest
+
+from app.core.catalog import SchemaCatalog
+from app.core.database import TableMeta
+
+
+def _meta(name: str, *columns: str) -> TableMeta:
+    return TableMeta(name=name, ddl=f"CREATE TABLE {name} ()", columns=dict.fromkeys(columns, "INT"))
+
+
+@pytest.fixture
+def catalog() -> Iterator[SchemaCatalog]:
+    """SchemaCatalog 是单例，测试结束后恢复原快照"""
+    catalog = SchemaCatalog()
+    snapshot = dict(vars(catalog))
+    catalog.load([
+        _meta("orders", "id", "user_id", "amount"),
+        _meta("users", "id", "name"),
+        _meta("products", "id", "name"),
+        _meta("refunds", "id", "order_id"),
+        _meta("coupons", "id", "code"),
+    ])
+    yield catalog
+    vars(catalog).update(snapshot)
+
+
+def test_lookup_caps_common_column_matches(catalog: SchemaCatalog) -> None:
+    tables = catalog.lookup("id")
+    assert len(tables) == SchemaCatalog._COLUMN_MATCH_LIMIT
+
+
+def test_lookup_prefers_query_tables(catalog: SchemaCatalog) -> None:
+    names = [meta.name for meta in catalog.lookup("id", query_tables={"coupons", "refunds"})]
+    assert names[:2] == ["refunds", "coupons"]
+
+
+def test_lookup_exact_table_then_fuzzy(catalog: SchemaCatalog) -> None:
+    assert [meta.name for meta in catalog.lookup("Orders")] == ["orders"]
+    assert "orders" in [meta.name for meta in catalog.lookup("order")]
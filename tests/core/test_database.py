@@ -0,0 +1,53 @@
+import pytest
+
+from app.core.database import BusinessDatabase
+from app.core.dialect import detect_dialect
+
+
+class _RecordingConnection:
+    """记录执行过的语句，会话标识已缓存，不需要真实连接"""
+
+    def __init__(self) -> None:
+        self.info = {BusinessDatabase._SESSION_ID_INFO_KEY: "42"}
+        self.executed: list[str] = []
+
+    async def execute(self, statement):
+        self.executed.append(str(statement))
+
+
+@pytest.fixture
+def mysql_db(monkeypatch: pytest.MonkeyPatch) -> BusinessDatabase:
+    db = BusinessDatabase()
+    monkeypatch.setattr(db, "_dialect", detect_dialect("mysql+aiomysql://localhost/test"))
+    return db
+
+
+@pytest.mark.parametrize("timeout", [0, None])
+async def test_prepare_guard_resets_session_timeout_when_unlimited(mysql_db: BusinessDatabase, timeout) -> None:
+    """不限制超时时也要下发 0，覆盖池化连接上一次查询留下的 MAX_EXECUTION_TIME"""
+    conn = _RecordingConnection()
+    guard = await mysql_db._prepare_guard(conn, "SELECT 1", timeout)
+    assert conn.executed == ["SET SESSION MAX_EXECUTION_TIME = 0"]
+    assert guard.sql == "SELECT 1"
+
+
+async def test_prepare_guard_sets_session_timeout(mysql_db: BusinessDatabase) -> None:
+    conn = _RecordingConnection()
+    await mysql_db._prepare_guard(conn, "SELECT 1", 10)
+    assert conn.executed == ["SET SESSION MAX_EXECUTION_TIME = 10000"]
+
+
+@pytest.mark.parametrize(("timeout", "expected"), [
+    (0, []),
+    (None, []),
+    (10, ["SET LOCAL statement_timeout = 10000"]),
+])
+async def test_prepare_guard_postgres_only_sets_requested_timeout(
+    monkeypatch: pytest.MonkeyPatch, timeout, expected: list[str],
+) -> None:
+    """SET LOCAL 随事务结束失效，不限制时不下发，保留角色或数据库上配置的 statement_timeout"""
+    db = BusinessDatabase()
+    monkeypatch.setattr(db, "_dialect", detect_dialect("postgresql+psycopg://localhost/test"))
+    conn = _RecordingConnection()
+    await db._prepare_guard(conn, "SELECT 1", timeout)
+    assert conn.executed == expected
@@ -0,0 +1,61 @@
+import pytest
+
+from app.core.dialect import detect_dialect
+
+_URLS = ["mysql+aiomysql://localhost/test", "postgresql+psycopg://localhost/test", "clickhouse+asynch://localhost/test"]
+
+
+@pytest.mark.parametrize("url", _URLS)
+def test_checksum_requires_explicit_columns(url: str) -> None:
+    dialect = detect_dialect(url)
+    assert dialect.build_checksum_sql("SELECT * FROM t") is None
+    assert dialect.build_checksum_sql("SELECT a, a FROM t") is None
+
+
+@pytest.mark.parametrize(("url", "combiner"), [
+    ("mysql+aiomysql://localhost/test", "CRC32(IFNULL(CAST(x AS CHAR), '<null>')) + CRC32(IFNULL(CAST(y AS CHAR)"),
+    ("postgresql+psycopg://localhost/test", "string_agg(h, '' ORDER BY h) FROM unnest(ARRAY[md5(COALESCE(x::text"),
+    ("clickhouse+asynch://localhost/test", "cityHash64(arraySort([ifNull(toString(x), '<null>'), ifNull(toString(y)"),
+])
+def test_checksum_combines_per_column_hashes_without_order(url: str, combiner: str) -> None:
+    """逐列取值后用与顺序无关的方式（求和 / 排序）组合成行哈希，列序和别名不同的等价候选校验和相同"""
+    checksum_sql = detect_dialect(url).build_checksum_sql("SELECT a AS x, b AS y FROM t")
+    assert combiner in checksum_sql
+    assert "CONCAT_WS" not in checksum_sql and "_checksum::text" not in checksum_sql
+
+
+@pytest.mark.parametrize(("sql", "expected"), [
+    ("SELECT id FROM t", "SELECT id FROM t LIMIT 100"),
+    ("SELECT id FROM t LIMIT 5", "SELECT id FROM t LIMIT 5"),
+    ("SELECT id FROM t LIMIT 500", "SELECT id FROM t LIMIT 100"),
+    ("SELECT id FROM t LIMIT 10 OFFSET 20", "SELECT id FROM t LIMIT 10 OFFSET 20"),
+])
+def test_apply_row_limit_pushes_cap_into_sql(sql: str, expected: str) -> None:
+    assert detect_dialect("mysql+aiomysql://localhost/test").apply_row_limit(sql, 100) == expected
+
+
+@pytest.mark.parametrize(("url", "sql"), [
+    ("postgresql+psycopg://localhost/test", "SELECT id FROM t FETCH FIRST 500 ROWS ONLY"),
+    ("clickhouse+asynch://localhost/test", "SELECT id FROM t LIMIT 1 BY id"),
+])
+def test_apply_row_limit_wraps_non_literal_limits(url: str, sql: str) -> None:
+    assert detect_dialect(url).apply_row_limit(sql, 100) == f"SELECT * FROM ({sql}) AS _limited LIMIT 100"
+
+
+def test_apply_row_limit_rejects_non_query() -> None:
+    with pytest.raises(ValueError):
+        detect_dialect("mysql+aiomysql://localhost/test").apply_row_limit("DELETE FROM t", 100)
+
+
+@pytest.mark.parametrize(("url", "error", "expected"), [
+    ("mysql+aiomysql://localhost/test", "(1054, \"Unknown column 'o.amt' in 'field list'\")", ["amt"]),
+    ("mysql+aiomysql://localhost/test", "(1146, \"Table 'shop.payments' doesn't exist\")", ["payments"]),
+    ("postgresql+psycopg://localhost/test", "column o.amt does not exist", ["amt"]),
+    ("postgresql+psycopg://localhost/test", 'relation "payments" does not exist', ["payments"]),
+    ("clickhouse+asynch://localhost/test", "Missing columns: 'amt' 'qty' while processing query", ["amt", "qty"]),
+    ("clickhouse+asynch://localhost/test", "Unknown table(s): payments, refunds", ["payments", "refunds"]),
+    ("mysql+aiomysql://localhost/test", "You have an error in your SQL syntax", []),
+])
+def test_extract_missing_identifiers(url: str, error: str, expected: list[str]) -> None:
+    """去掉库名、表别名前缀，只保留不存在的表名/列名"""
+    assert detect_dialect(url).extract_missing_identifiers(error) == expected
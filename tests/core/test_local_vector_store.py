@@ -0,0 +1,87 @@
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from app.core.local_vector_store import LocalVectorStore
+
+_VECTORS = {
+    "orders": [1.0, 0.0, 0.0],
+    "users": [0.0, 1.0, 0.0],
+    "refunds": [0.8, 0.0, 0.6],
+}
+
+
+class _FakeEmbeddings(Embeddings):
+    def __init__(self, dimension: int = 3) -> None:
+        self.dimension = dimension
+
+    def _embed(self, text: str) -> list[float]:
+        return _VECTORS.get(text, [0.0, 0.0, 1.0])[:self.dimension]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed(text)
+
+
+@pytest.fixture
+def store(tmp_path) -> LocalVectorStore:
+    store = LocalVectorStore(_FakeEmbeddings(), str(tmp_path))
+    store.add_texts(list(_VECTORS), ids=list(_VECTORS))
+    return store
+
+
+def test_search_ranks_by_cosine_similarity(store: LocalVectorStore) -> None:
+    results = store.similarity_search_with_score("orders", k=2)
+    assert [doc.id for doc, _ in results] == ["orders", "refunds"]
+    assert results[0][1] == pytest.approx(1.0)
+
+
+def test_add_replaces_existing_ids_and_delete_removes(store: LocalVectorStore) -> None:
+    store.add_texts(["users"], [{"v": 2}], ids=["users"])
+    assert len(store) == 3
+    assert store.get_by_ids(["users"])[0].metadata == {"v": 2}
+
+    store.delete(["orders"])
+    assert [doc.id for doc in store.similarity_search("orders", k=3)] == ["refunds", "users"]
+
+
+def test_index_survives_reload(store: LocalVectorStore, tmp_path) -> None:
+    reloaded = LocalVectorStore(_FakeEmbeddings(), str(tmp_path))
+    assert len(reloaded) == 3
+    assert reloaded.similarity_search("users", k=1)[0].id == "users"
+
+
+def test_dimension_mismatch_raises(store: LocalVectorStore, tmp_path) -> None:
+    """更换嵌入模型后沿用旧索引应明确报错，而不是在矩阵运算中失败"""
+    stale = LocalVectorStore(_FakeEmbeddings(dimension=2), str(tmp_path))
+    with pytest.raises(ValueError, match="dimension"):
+        stale.add_texts(["coupons"])
+    with pytest.raises(ValueError, match="dimension"):
+        stale.similarity_search("orders")
+
+
+def test_mismatched_metadatas_rejected(store: LocalVectorStore) -> None:
+    with pytest.raises(ValueError):
+        store.add_texts(["a", "b"], [{}])
+    assert len(store) == 3
+
+
+def test_reload_ignores_unreferenced_vectors(store: LocalVectorStore, tmp_path) -> None:
+    """写入中断只留下未被 documents.json 引用的矩阵文件，重新加载仍是上一版完整索引，下次写入时清理"""
+    orphan = tmp_path / "vectors-orphan.npy"
+    orphan.write_bytes(b"partial")
+    reloaded = LocalVectorStore(_FakeEmbeddings(), str(tmp_path))
+    assert len(reloaded) == 3 and not reloaded.needs_reindex
+
+    reloaded.delete(["orders"])
+    assert not orphan.exists()
+    assert len(list(tmp_path.glob("vectors*.npy"))) == 1
+
+
+def test_missing_vectors_requires_reindex(store: LocalVectorStore, tmp_path) -> None:
+    for vectors in tmp_path.glob("vectors*.npy"):
+        vectors.unlink()
+    reloaded = LocalVectorStore(_FakeEmbeddings(), str(tmp_path))
+    assert len(reloaded) == 0
+    assert reloaded.needs_reindex
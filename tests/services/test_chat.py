@@ -0,0 +1,65 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.messages import AIMessageChunk
+
+from app.agent.graph import CHART_ADVISOR, RESULT_SUMMARIZER, SQL_JUDGE
+from app.services.chat import ChatService
+
+
+def _token(node: str, content: str, message_id: str = "run-1") -> tuple:
+    return "messages", (AIMessageChunk(content=content, id=message_id), {"langgraph_node": node})
+
+
+class _FakeGraph:
+    def __init__(self, chunks: list[tuple]) -> None:
+        self.chunks = chunks
+
+    async def astream(self, input_data, config, stream_mode):
+        for chunk in self.chunks:
+            yield chunk
+
+    async def aget_state(self, config):
+        return SimpleNamespace(next=(), values={"is_success": False})
+
+
+async def _stream_events(monkeypatch: pytest.MonkeyPatch, chunks: list[tuple]) -> list[tuple[str, dict]]:
+    service = ChatService()
+
+    async def update_status(conversation_id, status):
+        return None
+
+    monkeypatch.setattr(service.repo, "update_status", update_status)
+    events = []
+    async for raw in service._stream_graph(_FakeGraph(chunks), SimpleNamespace(id=1), {}, {}):
+        event_line, data_line = raw.strip().split("\n")
+        events.append((event_line.removeprefix("event: "), json.loads(data_line.removeprefix("data: "))))
+    return events
+
+
+@pytest.mark.parametrize(("node", "expected"), [
+    (RESULT_SUMMARIZER, "华东"),
+    (CHART_ADVISOR, ""),
+    (SQL_JUDGE, ""),
+])
+def test_summary_delta_forwards_only_summarizer_tokens(node: str, expected: str) -> None:
+    assert ChatService._summary_delta((AIMessageChunk(content="华东"), {"langgraph_node": node})) == expected
+
+
+async def test_stream_filters_other_nodes_and_resets_on_retry(monkeypatch: pytest.MonkeyPatch) -> None:
+    events = await _stream_events(monkeypatch, [
+        _token(CHART_ADVISOR, '{"chart_type"'),
+        _token(RESULT_SUMMARIZER, "华东"),
+        _token(SQL_JUDGE, "1"),
+        _token(RESULT_SUMMARIZER, "华东", message_id="run-2"),
+        _token(RESULT_SUMMARIZER, "最高", message_id="run-2"),
+    ])
+
+    streamed = [(event, data) for event, data in events if event.startswith("summary_")]
+    assert streamed == [
+        ("summary_delta", {"delta": "华东"}),
+        ("summary_reset", {}),
+        ("summary_delta", {"delta": "华东"}),
+        ("summary_delta", {"delta": "最高"}),
+    ]
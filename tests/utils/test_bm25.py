@@ -0,0 +1,26 @@
+from app.utils.bm25 import BM25Index, reciprocal_rank_fusion, tokenize
+
+
+def test_tokenize_splits_identifiers_and_chinese() -> None:
+    assert tokenize("orderItems user_id") == ["orderitems", "order", "items", "user_id", "user", "id"]
+    assert tokenize("订单金额") == ["订单", "单金", "金额"]
+
+
+def test_bm25_ranks_rarer_matches_higher() -> None:
+    index = BM25Index([
+        tokenize("orders id user_id amount 订单"),
+        tokenize("users id name"),
+        tokenize("refunds id order_id amount 退款"),
+    ])
+    hits = index.search(tokenize("退款 amount"), k=3)
+    assert [doc_id for doc_id, _ in hits] == [2, 0]
+    assert index.search(tokenize("inventory"), k=3) == []
+
+
+def test_reciprocal_rank_fusion_rewards_agreement() -> None:
+    """两路都命中的 b 排第一，只在一路中出现的按名次排列"""
+    assert reciprocal_rank_fusion([["a", "b", "c"], ["b", "d", "e"]]) == ["b", "a", "d", "c", "e"]
+
+
+def test_reciprocal_rank_fusion_keeps_first_seen_order_on_ties() -> None:
+    assert reciprocal_rank_fusion([["a", "b"], ["b", "a"]]) == ["a", "b"]
@@ -0,0 +1,46 @@
+from app.utils.cache import LRUCache, estimate_size
+
+
+def test_estimate_size_counts_nested_values() -> None:
+    assert estimate_size("abcd") == 4
+    assert estimate_size([1.0, 2.0]) == 16
+    assert estimate_size({"ab": [1, 2]}) == 2 + 16
+
+
+async def test_byte_bound_evicts_least_recently_used() -> None:
+    cache = LRUCache(maxsize=100, max_bytes=10)
+    await cache.set("a", "xxxx")
+    await cache.set("b", "yyyy")
+    assert await cache.get("a") == "xxxx"
+
+    await cache.set("c", "zzzz")
+
+    assert await cache.get("b") is None
+    assert await cache.get("a") == "xxxx"
+    assert await cache.get("c") == "zzzz"
+    assert cache.current_bytes == 8
+
+
+async def test_oversized_value_is_not_cached() -> None:
+    cache = LRUCache(maxsize=100, max_bytes=10)
+    await cache.set("a", "xxxx")
+    await cache.set("big", "y" * 11)
+    assert await cache.get("big") is None
+    assert await cache.get("a") == "xxxx"
+
+
+async def test_oversized_replacement_drops_stale_value() -> None:
+    cache = LRUCache(maxsize=100, max_bytes=10)
+    await cache.set("a", "xxxx")
+    await cache.set("a", "y" * 11)
+    assert await cache.get("a") is None
+    assert cache.current_bytes == 0
+
+
+async def test_replace_and_delete_keep_byte_count() -> None:
+    cache = LRUCache(maxsize=100, max_bytes=100)
+    await cache.set("a", "xxxx")
+    await cache.set("a", "xx")
+    assert cache.current_bytes == 2
+    await cache.delete("a")
+    assert cache.current_bytes == 0
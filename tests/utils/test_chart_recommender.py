@@ -0,0 +1,82 @@
+from datetime import date
+
+import pytest
+
+from app.schemas.agent import ChartType
+from app.utils import chart_recommender
+from app.utils.chart_recommender import recommend, recommend_confident
+
+
+@pytest.mark.parametrize(("column", "expected"), [
+    ("order_date", True),
+    ("createdAt", True),
+    ("created_at", True),
+    ("月份", True),
+    ("下单日", True),
+    ("update_by", False),
+    ("年龄段", False),
+    ("weekday_name", False),
+    ("status", False),
+])
+def test_time_column_matches_whole_words(column: str, expected: bool) -> None:
+    assert chart_recommender._is_time_column(column) is expected
+
+
+@pytest.mark.parametrize(("value", "expected"), [
+    (date(2024, 1, 5), True),
+    ("2024-01-05", True),
+    ("2024-01-05 10:00:00", True),
+    ("2024年3月", True),
+    ("2024Q1", True),
+    ("华东", False),
+    ("20240105", False),
+])
+def test_date_value_detection(value, expected: bool) -> None:
+    assert chart_recommender._is_date_value(value) is expected
+
+
+def test_confident_line_for_parseable_date_strings() -> None:
+    rows = [{"period": "2024-01", "gmv": 10}, {"period": "2024-02", "gmv": 12}]
+    advice = recommend_confident(rows)
+    assert advice.chart_type == ChartType.LINE and advice.x_field == "period"
+
+
+def test_confident_bar_for_column_containing_time_substring() -> None:
+    """年龄段 包含 年、update_by 包含 date 的子串，但都是类别维度"""
+    rows = [{"年龄段": "18-25", "人数": 10}, {"年龄段": "26-35", "人数": 20}]
+    assert recommend_confident(rows).chart_type == ChartType.BAR
+    rows = [{"update_by": "alice", "cnt": 3}, {"update_by": "bob", "cnt": 5}]
+    assert recommend_confident(rows).chart_type == ChartType.BAR
+
+
+def test_confident_defers_ambiguous_shapes() -> None:
+    rows = [{"region": "华东", "city": "上海", "gmv": 1, "orders": 2}]
+    assert recommend_confident(rows) is None
+
+
+def test_confident_scatter_for_two_measures() -> None:
+    rows = [{"price": i, "sales": i * 2} for i in range(3)]
+    assert recommend_confident(rows).chart_type == ChartType.SCATTER
+
+
+def test_recommend_honours_preference() -> None:
+    rows = [{"region": "华东", "gmv": 1}]
+    assert recommend(rows, preference=ChartType.PIE).chart_type == ChartType.PIE
+    assert recommend(rows).chart_type == ChartType.BAR
+
+
+@pytest.mark.parametrize(("rows", "preference", "expected"), [
+    ([{"region": "华东", "gmv": 1}], ChartType.SCATTER, False),
+    ([{"region": "华东", "gmv": 1, "orders": 2}], ChartType.SCATTER, True),
+    ([{"month": "2024-01", "region": "华东", "gmv": 1}], ChartType.PIE, False),
+    ([{"region": "华东", "gmv": 1}], ChartType.FUNNEL, True),
+    ([{"region": "华东", "gmv": 1}], ChartType.LINE, False),
+    ([{"month": "2024-01", "gmv": 1}], ChartType.AREA, True),
+])
+def test_preference_must_fit_result_shape(rows, preference: ChartType, expected: bool) -> None:
+    assert chart_recommender.fits_preference(rows, preference) is expected
+
+
+def test_recommend_ignores_unfit_preference() -> None:
+    rows = [{"region": "华东", "gmv": 1}]
+    assert recommend(rows, preference=ChartType.SCATTER).chart_type == ChartType.BAR
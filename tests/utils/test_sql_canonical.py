@@ -0,0 +1,43 @@
+import pytest
+
+from app.utils.sql_canonical import canonical_hash, canonicalize
+
+
+@pytest.mark.parametrize(("a", "b"), [
+    ("SELECT id FROM orders WHERE amount > 10", "select  id\nfrom orders where amount > 10;"),
+    ("SELECT o.id FROM orders o", "SELECT x.id FROM orders AS x"),
+    ("SELECT SUM(amount) AS total FROM orders", "SELECT SUM(amount) AS s FROM orders"),
+    ("SELECT id FROM orders WHERE a = 1 AND b = 2", "SELECT id FROM orders WHERE b = 2 AND a = 1"),
+])
+def test_equivalent_sql_shares_canonical_form(a: str, b: str) -> None:
+    assert canonicalize(a, "mysql") == canonicalize(b, "mysql")
+    assert canonical_hash(a, "mysql") == canonical_hash(b, "mysql")
+
+
+def test_different_sql_keeps_distinct_hash() -> None:
+    assert canonical_hash("SELECT id FROM orders", "mysql") != canonical_hash("SELECT id FROM users", "mysql")
+
+
+def test_unparseable_sql_falls_back_to_normalized_text() -> None:
+    assert canonicalize("SELEC  id FROM;", "mysql") == "selec id from"
+
+
+@pytest.mark.parametrize(("a", "b"), [
+    (
+        "WITH x AS (SELECT id AS k, name AS v FROM t) SELECT k FROM x",
+        "WITH x AS (SELECT id AS v, name AS k FROM t) SELECT k FROM x",
+    ),
+    (
+        "SELECT s.k FROM (SELECT id AS k, name AS v FROM t) AS s",
+        "SELECT s.k FROM (SELECT id AS v, name AS k FROM t) AS s",
+    ),
+])
+def test_inner_aliases_are_kept(a: str, b: str) -> None:
+    """CTE 与子查询内部的别名被外层引用，互换后语义不同，不能得到相同的规范形式"""
+    assert canonicalize(a, "mysql") != canonicalize(b, "mysql")
+
+
+def test_union_branch_aliases_are_stripped() -> None:
+    a = "SELECT a AS x FROM t UNION SELECT b AS y FROM u"
+    b = "SELECT a AS p FROM t UNION SELECT b AS q FROM u"
+    assert canonicalize(a, "mysql") == canonicalize(b, "mysql")
@@ -7,6 +7,7 @@ import type {
   SSEError,
   SSEFollowUp,
   SSEResult,
+  SSESummaryDelta,
 } from '../types'
 
 const FALLBACK_RESULT_MSG = '查询完成'
@@ -16,6 +17,7 @@ const FALLBACK_NETWORK_ERROR = '网络错误'
 /** 节点名称到中文标签的映射 */
 const NODE_LABELS: Record<string, string> = {
   schema_retriever: '检索表结构',
+  schema_prefetch: '预取表结构',
   intent_parse: '解析意图',
   follow_up: '追问确认',
   sql_generator: '生成 SQL',
@@ -25,8 +27,14 @@ const NODE_LABELS: Record<string, string> = {
   executor: '执行查询',
   chart_advisor: '图表建议',
   result_summarizer: '总结结果',
+  presentation_change: '切换图表',
+  finalize: '整理回复',
 }
 
+/** 去掉尚未完成的流式总结消息 */
+const withoutStreaming = (messages: Message[]): Message[] =>
+  messages.filter((m) => !m.streaming)
+
 interface ChatState {
   conversations: Conversation[]
   activeId: number | null
@@ -224,6 +232,32 @@ export const useChatStore = create<ChatState>((set, get) => ({
             }))
             break
           }
+          case 'summary_delta': {
+            const { delta } = data as unknown as SSESummaryDelta
+            set((s) => {
+              const last = s.messages[s.messages.length - 1]
+              if (last?.streaming) {
+                return {
+                  messages: [
+                    ...s.messages.slice(0, -1),
+                    { ...last, content: last.content + delta },
+                  ],
+                }
+              }
+              return {
+                messages: [
+                  ...s.messages,
+                  { role: 'assistant' as const, content: delta, streaming: true },
+                ],
+              }
+            })
+            break
+          }
+          case 'summary_reset': {
+            // 总结 LLM 重试，丢弃上一次调用已显示的部分内容
+            set((s) => ({ messages: withoutStreaming(s.messages) }))
+            break
+          }
           case 'follow_up': {
             const { question } = data as unknown as SSEFollowUp
             set({
@@ -244,7 +278,7 @@ export const useChatStore = create<ChatState>((set, get) => ({
               executeResult: execute_result,
               currentNode: null,
               messages: [
-                ...get().messages,
+                ...withoutStreaming(get().messages),
                 {
                   role: 'assistant',
                   content,
@@ -265,7 +299,7 @@ export const useChatStore = create<ChatState>((set, get) => ({
               currentNode: null,
               nodeSteps: failStepsOnError(s.nodeSteps),
               messages: [
-                ...get().messages,
+                ...withoutStreaming(get().messages),
                 { role: 'assistant', content: FALLBACK_ERROR_MSG },
               ],
             }))
@@ -59,6 +59,8 @@ export interface Message {
   content: string
   executeResult?: Record<string, unknown>[] | null
   chartOption?: Record<string, unknown> | null
+  /** 总结仍在逐 token 生成中，收到 result 事件后替换为完整消息 */
+  streaming?: boolean
 }
 
 export interface ConversationDetail {
@@ -106,6 +108,10 @@ export interface SSEFollowUp {
   question: string
 }
 
+export interface SSESummaryDelta {
+  delta: string
+}
+
 export interface SSEResult {
   sql: string | null
   summary: string | null